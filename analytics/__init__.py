@@ -0,0 +1,34 @@
+"""
+Compute core behind the Streamlit pages, free of any UI code.
+
+    correlation    cross-sectional and rolling correlation engine
+    decomposition  cached classical, STL and MSTL seasonal decomposition
+    density        binned histogram and FFT kernel density
+    indicators     batch technical indicators
+    periods        ASX trading calendar and period resampling engine
+    regression     linear price trend, rolling and expanding
+    returns        period returns and their distribution statistics
+    rolling        rolling statistics from cached prefix sums
+    seasonality    calendar effects and autocorrelation
+    series_index   date-range lookup and prefix aggregates of one series
+    stats          mergeable moments and descriptive statistics
+
+Submodules are imported on first attribute access (PEP 562), and each one
+loads SciPy, statsmodels and Polars through lazy_imports only when a
+function first needs them, so importing the package costs milliseconds in
+the app and in batch worker processes.
+"""
+import importlib
+
+__all__ = ['correlation', 'decomposition', 'density', 'indicators', 'periods', 'regression', 'returns', 'rolling',
+           'seasonality', 'series_index', 'stats']
+
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module(f'{__name__}.{name}')
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
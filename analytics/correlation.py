@@ -0,0 +1,232 @@
+"""
+Cross-sectional correlation engine over an aligned returns matrix.
+
+Missing values (tickers listed later, index holidays) are handled pairwise:
+each pair uses the days on which both series have a return, computed for all
+pairs at once with mask matrix products instead of a loop over pairs.
+"""
+import numpy as np
+import pandas as pd
+
+from lazy_imports import lazy_import
+
+hierarchy = lazy_import('scipy.cluster.hierarchy')
+spatial_distance = lazy_import('scipy.spatial.distance')
+
+
+def returns_matrix(closes):
+    """
+    Turn close prices into simple returns and align them on date.
+
+    Each series' returns are taken over its own trading days before aligning,
+    so a day missing from one series does not blank out another's return.
+
+    Parameter:
+        closes: {ticker: Series of closes indexed by date} or a DataFrame of closes
+
+    Return:
+        DataFrame of returns (dates x tickers) with NaN where a ticker has no return
+    """
+    prices = pd.DataFrame(closes)
+    returns = pd.DataFrame({
+        ticker: prices[ticker].dropna().pct_change().iloc[1:] for ticker in prices.columns
+    }).sort_index()
+    returns.index = pd.DatetimeIndex(returns.index)
+    return returns
+
+
+def _masked(returns):
+    values = np.asarray(returns, dtype=float)
+    mask = ~np.isnan(values)
+    return np.where(mask, values, 0.0), mask.astype(float)
+
+
+def _corr_from_sums(n, sx, sy, sxx, syy, sxy, min_periods):
+    """Pearson correlation from co-moment sums, NaN where fewer than min_periods pairs"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sxy - sx * sy / n
+        var_x = sxx - sx * sx / n
+        var_y = syy - sy * sy / n
+        corr = cov / np.sqrt(var_x * var_y)
+    corr[(n < max(min_periods, 2)) | ~np.isfinite(corr)] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+def correlation_matrix(returns, min_periods=20):
+    """
+    N x N pairwise-complete correlation matrix from a returns matrix in five
+    matrix products, O(T * N^2) flops with no Python loop over pairs
+    """
+    x, m = _masked(returns)
+    n = m.T @ m
+    sx = x.T @ m            # sx[i, j]: sum of x_i over days where j is present
+    sxx = (x * x).T @ m
+    sxy = x.T @ x
+    corr = _corr_from_sums(n, sx, sx.T, sxx, sxx.T, sxy, min_periods)
+    np.fill_diagonal(corr, np.where(np.diag(n) >= max(min_periods, 2), 1.0, np.nan))
+
+    if isinstance(returns, pd.DataFrame):
+        return pd.DataFrame(corr, index=returns.columns, columns=returns.columns)
+    return corr
+
+
+def rolling_correlation_vs(returns, target, window, min_periods=None):
+    """
+    Rolling correlation of every column of returns against one target series.
+
+    Uses prefix sums along time, so each window is an O(1) difference of two
+    cumulative rows instead of a recomputation over the window.
+    """
+    min_periods = window if min_periods is None else min_periods
+    x, mx = _masked(returns)
+    y, my = _masked(np.asarray(target, dtype=float).reshape(-1, 1))
+
+    m = mx * my
+    x, y = x * m, y * m
+    sums = [m, x, y, x * x, y * y, x * y]
+
+    windowed = []
+    for values in sums:
+        cumulative = np.cumsum(values, axis=0)
+        lagged = np.zeros_like(cumulative)
+        lagged[window:] = cumulative[:-window]
+        windowed.append(cumulative - lagged)
+
+    corr = _corr_from_sums(*windowed, min_periods)
+
+    if isinstance(returns, pd.DataFrame):
+        return pd.DataFrame(corr, index=returns.index, columns=returns.columns)
+    return corr
+
+
+def calculate_correlations(stock_data, market_data, window, ticker=None):
+    """
+    Calculate static and rolling correlations of the stock against every index
+    in one vectorized pass over the aligned returns matrix. Rolling windows are
+    served from co-moment prefix sums cached per (ticker, indices), so moving
+    the window slider does not recompute them
+    """
+    from analytics.rolling import rolling_correlation
+
+    # Convert stock data to pandas series
+    stock_prices = pd.Series(stock_data['Close'].values, index=pd.to_datetime(stock_data['Date']))
+
+    returns = returns_matrix({'Stock': stock_prices, **market_data})
+    market_returns = returns.drop(columns='Stock')
+
+    static = correlation_matrix(returns, min_periods=2)['Stock']
+    series_key = (ticker, 'Correlation', tuple(market_returns.columns)) if ticker else None
+    rolling = pd.DataFrame(
+        rolling_correlation(series_key, returns.index, market_returns, returns['Stock'], window),
+        index=returns.index, columns=market_returns.columns
+    )
+
+    correlations = {name: static[name] for name in market_data}
+    rolling_correlations = {name: rolling[name] for name in market_data}
+
+    return correlations, rolling_correlations
+
+
+def _comoment_sums(x, m):
+    """Co-moment sums (n, sx, sxx, sxy) of a block of masked rows"""
+    return [m.T @ m, x.T @ m, (x * x).T @ m, x.T @ x]
+
+
+class RollingCorrelation:
+    """
+    Incremental N x N rolling correlation.
+
+    push() adds the newest rows of returns and drops the rows leaving the window
+    by updating co-moment sums, O(N^2) per step (O(1) per pair) instead of
+    recomputing the window. Sums are rebuilt from the window every
+    `refresh_every` rows to keep floating-point drift bounded.
+    """
+
+    def __init__(self, n_series, window, min_periods=None, refresh_every=1000):
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.refresh_every = refresh_every
+        self._rows = np.zeros((window, n_series))
+        self._masks = np.zeros((window, n_series))
+        self._count = 0
+        self._since_refresh = 0
+        self._sums = _comoment_sums(self._rows, self._masks)
+
+    def _update(self, x, m, sign):
+        for total, block in zip(self._sums, _comoment_sums(x, m)):
+            total += sign * block
+
+    def push(self, rows):
+        """Add one or more days of returns (NaN for missing), oldest first"""
+        rows = np.asarray(rows, dtype=float)
+        x, m = _masked(rows.reshape(-1, rows.shape[-1]))
+        x, m = x[-self.window:], m[-self.window:]
+
+        positions = self._count + np.arange(len(x))
+        slots = positions % self.window
+        leaving = slots[positions >= self.window]
+        if len(leaving):
+            self._update(self._rows[leaving], self._masks[leaving], -1.0)
+        self._rows[slots], self._masks[slots] = x, m
+        self._update(x, m, 1.0)
+
+        self._count += len(x)
+        self._since_refresh += len(x)
+        if self._since_refresh >= self.refresh_every:
+            self._sums = _comoment_sums(self._rows, self._masks)
+            self._since_refresh = 0
+
+    def matrix(self):
+        """Correlation matrix of the current window"""
+        n, sx, sxx, sxy = self._sums
+        return _corr_from_sums(n, sx, sx.T, sxx, sxx.T, sxy, self.min_periods)
+
+
+def iter_rolling_matrices(returns, window, step=1, min_periods=None):
+    """
+    Yield (date, N x N correlation matrix) for every `step`-th full window.
+    The rows between two yields enter and leave the window as one block update
+    """
+    values = np.asarray(returns, dtype=float)
+    engine = RollingCorrelation(values.shape[1], window, min_periods)
+    dates = returns.index if isinstance(returns, pd.DataFrame) else np.arange(len(values))
+
+    start = 0
+    for end in range(window - 1, len(values), step):
+        engine.push(values[start:end + 1])
+        start = end + 1
+        yield dates[end], engine.matrix()
+
+
+def rolling_mean_correlation(returns, window, step=1, min_periods=None):
+    """Average off-diagonal rolling correlation, a single co-movement series for a group"""
+    n_series = np.asarray(returns).shape[1]
+    off_diagonal = ~np.eye(n_series, dtype=bool)
+
+    dates, values = [], []
+    for date, corr in iter_rolling_matrices(returns, window, step, min_periods):
+        dates.append(date)
+        values.append(np.nanmean(corr[off_diagonal]) if np.isfinite(corr[off_diagonal]).any() else np.nan)
+    return pd.Series(values, index=dates, name='Mean Correlation')
+
+
+def cluster_order(corr):
+    """
+    Leaf order of an average-linkage hierarchical clustering on the correlation
+    distance sqrt((1 - corr) / 2), used to group similar tickers in the heatmap
+    """
+    values = np.nan_to_num(np.asarray(corr, dtype=float), nan=0.0)
+    if len(values) < 3:
+        return np.arange(len(values))
+
+    distance = np.sqrt(np.clip((1.0 - values) / 2.0, 0.0, 1.0))
+    np.fill_diagonal(distance, 0.0)
+    distance = (distance + distance.T) / 2.0
+    condensed = spatial_distance.squareform(distance, checks=False)
+    return hierarchy.leaves_list(hierarchy.linkage(condensed, method='average'))
+
+
+def clustered(corr):
+    """Correlation DataFrame reordered so that clustered tickers sit together"""
+    order = cluster_order(corr)
+    return corr.iloc[order, order]
@@ -0,0 +1,229 @@
+"""
+Seasonal decomposition service: classical, STL and MSTL, cached per series.
+
+A decomposition is kept per (series, method, periods, model) and brought up
+to date in place when the series grows, the way rolling states are:
+
+    classical  moving-average trend and per-phase seasonal means, as
+               statsmodels seasonal_decompose. New bars only extend the
+               trend convolution over the tail and add to the phase sums
+    STL        robust LOESS decomposition of one period
+    MSTL       STL iterated over several periods (weekly, monthly, ...)
+
+STL and MSTL are refitted over the whole series when it grows: robust STL's
+weights and MSTL's iterations depend on every bar, so a refit of the tail
+alone would not match a fresh fit. They are still fitted once per series
+version rather than on every rerun. Multiplicative STL and MSTL decompose
+the log of the series.
+
+statsmodels is loaded lazily, so importing the service costs nothing until a
+decomposition is requested.
+"""
+import threading
+
+import numpy as np
+
+from lazy_imports import lazy_import
+from ttl_cache import get_cache, precompute
+
+pd = lazy_import('pandas')
+seasonal = lazy_import('statsmodels.tsa.seasonal')
+
+METHODS = ('classical', 'STL', 'MSTL')
+
+# Periods the seasonality page offers, and those worth decomposing ahead of
+# time within them: trading week, the page's default, month and year in weeks
+PERIOD_RANGE = (2, 52)
+COMMON_PERIODS = (5, 12, 21, 52)
+
+# Weekly and monthly cycles of daily bars, the default MSTL periods
+MSTL_PERIODS = (5, 21)
+
+DECOMPOSITION_TTL = 6 * 60 * 60
+
+
+def _centred_filter(period):
+    """Weights of the centred moving average seasonal_decompose uses"""
+    if period % 2 == 0:
+        return np.r_[0.5, np.ones(period - 1), 0.5] / period
+    return np.ones(period) / period
+
+
+class Decomposition:
+    """
+    Trend, seasonal and residual components of one series, updated in place
+    as bars are appended. Use under `lock` when shared
+    """
+
+    def __init__(self, method, periods, model, dates, values):
+        if method not in METHODS:
+            raise ValueError(f"Unknown decomposition method {method!r}")
+        self.method = method
+        self.periods = tuple(periods)
+        self.model = model
+        self.lock = threading.Lock()
+        self._fit(np.asarray(dates, dtype='datetime64[ns]'), np.asarray(values, dtype=float))
+
+    def __len__(self):
+        return len(self.values)
+
+    def _fit(self, dates, values):
+        if self.model == 'multiplicative' and np.any(values <= 0):
+            raise ValueError("Multiplicative seasonality is not appropriate for zero and negative values")
+        self.dates, self.values = dates, values
+        if self.method == 'classical':
+            self._fit_classical()
+        else:
+            self.trend, self.seasonal, self.resid = self._fit_stl(values)
+
+    def _fit_classical(self):
+        period = self.periods[0]
+        n = len(self.values)
+        self._filter = _centred_filter(period)
+        self._half = len(self._filter) // 2
+        if n < 2 * period:
+            raise ValueError(f"Need at least {2 * period} observations for a period of {period}")
+
+        self.trend = np.full(n, np.nan)
+        self.trend[self._half:n - self._half] = np.convolve(self.values, self._filter, 'valid')
+        self._phase_count = np.zeros(period)
+        self._phase_sum = np.zeros(period)
+        self._add_detrended(self._half, n - self._half)
+        self._seasonal_from_phases()
+
+    def _fit_stl(self, values):
+        """(trend, seasonal, resid) of values by STL or MSTL"""
+        multiplicative = self.model == 'multiplicative'
+        x = np.log(values) if multiplicative else values
+
+        if self.method == 'STL':
+            result = seasonal.STL(x, period=self.periods[0], robust=True).fit()
+            season = np.asarray(result.seasonal)
+        else:
+            result = seasonal.MSTL(x, periods=self.periods).fit()
+            season = np.asarray(result.seasonal)
+            season = season.sum(axis=1) if season.ndim > 1 else season
+        trend, resid = np.asarray(result.trend), np.asarray(result.resid)
+
+        if multiplicative:
+            return np.exp(trend), np.exp(season), np.exp(resid)
+        return trend, season, resid
+
+    def _detrended(self, start, stop):
+        if self.model == 'multiplicative':
+            return self.values[start:stop] / self.trend[start:stop]
+        return self.values[start:stop] - self.trend[start:stop]
+
+    def _add_detrended(self, start, stop):
+        """Add the detrended values of rows [start, stop) to the phase sums"""
+        detrended = self._detrended(start, stop)
+        finite = np.isfinite(detrended)
+        phases = np.arange(start, stop)[finite] % self.periods[0]
+        self._phase_count += np.bincount(phases, minlength=self.periods[0])
+        self._phase_sum += np.bincount(phases, detrended[finite], minlength=self.periods[0])
+
+    def _seasonal_from_phases(self):
+        period = self.periods[0]
+        figure = self._phase_sum / self._phase_count
+        figure = figure / figure.mean() if self.model == 'multiplicative' else figure - figure.mean()
+        self.seasonal = figure[np.arange(len(self.values)) % period]
+        detrended = self._detrended(0, len(self.values))
+        if self.model == 'multiplicative':
+            self.resid = detrended / self.seasonal
+        else:
+            self.resid = detrended - self.seasonal
+
+    def _append_classical(self, dates, values):
+        n_old, half = len(self.values), self._half
+        self.dates, self.values = dates, values
+        n = len(values)
+
+        # Trend rows newly inside the moving-average window, from the tail only
+        self.trend = np.r_[self.trend[:n_old - half], np.full(n - n_old + half, np.nan)]
+        self.trend[n_old - half:n - half] = np.convolve(values[n_old - 2 * half:], self._filter, 'valid')
+        self._add_detrended(n_old - half, n - half)
+        self._seasonal_from_phases()
+
+    def update(self, dates, values):
+        """
+        Bring the components up to the given bars: nothing to do when they are
+        the bars already decomposed, an in-place append for classical when they
+        continue them, a full refit otherwise
+        """
+        dates = np.asarray(dates, dtype='datetime64[ns]')
+        values = np.asarray(values, dtype=float)
+        if self.model == 'multiplicative' and np.any(values <= 0):
+            raise ValueError("Multiplicative seasonality is not appropriate for zero and negative values")
+        n_old = len(self.values)
+        continues = (
+            len(dates) >= n_old
+            and dates[0] == self.dates[0]
+            and dates[n_old - 1] == self.dates[-1]
+            and values[0] == self.values[0]
+            and values[n_old - 1] == self.values[-1]
+        )
+        if continues and len(dates) == n_old:
+            return
+        if continues and self.method == 'classical':
+            self._append_classical(dates, values)
+        else:
+            self._fit(dates, values)
+
+    def components(self, index=None):
+        """{'Original', 'Trend', 'Seasonal', 'Residual'} as Series over index"""
+        index = pd.DatetimeIndex(self.dates) if index is None else index
+        return {
+            'Original': pd.Series(self.values, index=index),
+            'Trend': pd.Series(self.trend, index=index),
+            'Seasonal': pd.Series(self.seasonal, index=index),
+            'Residual': pd.Series(self.resid, index=index),
+        }
+
+
+def _periods(method, period):
+    if method == 'MSTL':
+        return tuple(sorted(np.atleast_1d(period).tolist()))
+    return (int(period),)
+
+
+def _state(key, data, periods, model, method):
+    """Cached Decomposition of data, brought up to date; lock held on return"""
+    if key is None:
+        state = Decomposition(method, periods, model, data.index, data.to_numpy())
+        state.lock.acquire()
+        return state
+
+    cache = get_cache('decomposition', ttl=DECOMPOSITION_TTL, maxsize=64)
+    state = cache.get_or_compute(tuple(key) + (method, periods, model),
+                                 lambda: Decomposition(method, periods, model, data.index, data.to_numpy()))
+    state.lock.acquire()
+    try:
+        state.update(data.index, data.to_numpy())
+    except Exception:
+        state.lock.release()
+        raise
+    return state
+
+
+def decompose(key, data, period, model='additive', method='classical'):
+    """
+    Original series and its trend, seasonal and residual components, from the
+    decomposition cached under key (the series identity, e.g. (ticker, 'Close');
+    no caching when key is None). `period` is a tuple of periods for MSTL
+    """
+    state = _state(key, data, _periods(method, period), model, method)
+    try:
+        return state.components(data.index)
+    finally:
+        state.lock.release()
+
+
+def precompute_periods(key, data, model='additive', method='classical', periods=COMMON_PERIODS):
+    """Decompose the common periods in the background so switching to them is instant"""
+    if key is None or method == 'MSTL':
+        return
+    cache = get_cache('decomposition', ttl=DECOMPOSITION_TTL, maxsize=64)
+    for period in periods:
+        if PERIOD_RANGE[0] <= period <= PERIOD_RANGE[1] and len(data) >= 2 * period:
+            precompute(cache, tuple(key) + (method, (period,), model),
+                       lambda period=period: Decomposition(method, (period,), model, data.index, data.to_numpy()))
@@ -0,0 +1,220 @@
+"""
+Batch technical indicator engine.
+
+A whole configurable set of indicators (several lengths of SMA/EMA/WMA/DEMA,
+RSI, MACD and Bollinger Bands) is computed from one close array in a single
+pass: window averages are differences of shared prefix sums and exponential
+averages are first-order recursive filters, so every indicator is O(n)
+whatever its length. Nothing here touches Streamlit, so the same engine
+serves the price page and headless screens of the ticker universe.
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from lazy_imports import lazy_import
+from ttl_cache import TTLCache
+
+signal = lazy_import('scipy.signal')
+
+# Indicator sets stay cached for an hour per series version
+INDICATOR_CACHE_TTL = 60 * 60
+
+# Moving-average lengths offered on the price page
+MA_LENGTHS = (10, 20, 50, 100, 200)
+
+DEFAULT_INDICATORS = (
+    ('sma', MA_LENGTHS),
+    ('ema', MA_LENGTHS),
+    ('wma', MA_LENGTHS),
+    ('dema', MA_LENGTHS),
+    ('rsi', (14,)),
+    ('macd', ((12, 26, 9),)),
+    ('bbands', ((20, 2.0),)),
+)
+
+_indicator_cache = TTLCache(ttl=INDICATOR_CACHE_TTL, maxsize=128)
+
+
+class _PrefixSums:
+    """Cumulative sums of a series shared by every window-based indicator"""
+
+    def __init__(self, values):
+        self.values = values
+        valid = ~np.isnan(values)
+        x = np.where(valid, values, 0.0)
+        # Centred on the first value so rolling variances of prices stay well conditioned
+        self.shift = values[valid][0] if valid.any() else 0.0
+        xc = np.where(valid, values - self.shift, 0.0)
+        index = np.arange(len(values), dtype=float)
+        self.count = np.concatenate(([0], np.cumsum(valid)))
+        self.sum = np.concatenate(([0.0], np.cumsum(x)))
+        self.centred = np.concatenate(([0.0], np.cumsum(xc)))
+        self.squares = np.concatenate(([0.0], np.cumsum(xc * xc)))
+        self.weighted = np.concatenate(([0.0], np.cumsum(index * x)))
+
+    def window(self, prefix, length):
+        """Trailing-window sums of a prefix array, NaN until the window holds `length` values"""
+        result = np.full(len(self.values), np.nan)
+        if len(self.values) >= length:
+            full = (self.count[length:] - self.count[:-length]) == length
+            result[length - 1:] = np.where(full, prefix[length:] - prefix[:-length], np.nan)
+        return result
+
+
+def sma(values, length, sums=None):
+    """Simple moving average"""
+    sums = sums or _PrefixSums(np.asarray(values, dtype=float))
+    return sums.window(sums.sum, length) / length
+
+
+def wma(values, length, sums=None):
+    """Linearly weighted moving average, weights 1..length with the newest bar heaviest"""
+    sums = sums or _PrefixSums(np.asarray(values, dtype=float))
+    # sum_j (j - t + length) x_j over the window, from sums of x and of j * x
+    offset = np.arange(len(sums.values), dtype=float) - length
+    weighted = sums.window(sums.weighted, length) - offset * sums.window(sums.sum, length)
+    return weighted / (length * (length + 1) / 2)
+
+
+def rolling_std(values, length, ddof=0, sums=None):
+    """Rolling standard deviation from centred prefix sums"""
+    sums = sums or _PrefixSums(np.asarray(values, dtype=float))
+    s1 = sums.window(sums.centred, length)
+    s2 = sums.window(sums.squares, length)
+    return np.sqrt(np.maximum(s2 - s1 * s1 / length, 0.0) / (length - ddof))
+
+
+def ewm(values, alpha, seed_length):
+    """
+    Exponential average y_t = alpha * x_t + (1 - alpha) * y_{t-1}, run as a
+    recursive filter. It is seeded with the mean of the first `seed_length`
+    values after any leading NaNs and is NaN before the seed
+    """
+    values = np.asarray(values, dtype=float)
+    result = np.full(len(values), np.nan)
+    valid = np.flatnonzero(~np.isnan(values))
+    if len(valid) == 0 or valid[0] + seed_length > len(values):
+        return result
+    first = valid[0]
+    seed_end = first + seed_length - 1
+
+    # Interior gaps take the previous value
+    filled = pd.Series(values[first:]).ffill().to_numpy()
+    seed = filled[:seed_length].mean()
+    result[seed_end] = seed
+    if seed_end + 1 < len(values):
+        result[seed_end + 1:], _ = signal.lfilter([alpha], [1.0, alpha - 1.0], filled[seed_length:],
+                                                  zi=[(1.0 - alpha) * seed])
+    return result
+
+
+def ema(values, length):
+    """Exponential moving average with span `length`, seeded with the SMA of the first bars"""
+    return ewm(values, 2.0 / (length + 1), length)
+
+
+def dema(values, length):
+    """Double exponential moving average, 2 * EMA - EMA(EMA)"""
+    first = ema(values, length)
+    return 2 * first - ema(first, length)
+
+
+def rsi(values, length=14):
+    """Relative Strength Index with Wilder's smoothing"""
+    change = np.diff(np.asarray(values, dtype=float), prepend=np.nan)
+    gain = ewm(np.where(change > 0, change, np.where(np.isnan(change), np.nan, 0.0)), 1.0 / length, length)
+    loss = ewm(np.where(change < 0, -change, np.where(np.isnan(change), np.nan, 0.0)), 1.0 / length, length)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(loss == 0, 100.0, 100.0 - 100.0 / (1.0 + gain / loss))
+
+
+def compute_indicators(close, spec=DEFAULT_INDICATORS):
+    """
+    Every indicator of `spec` over one close series in a single pass.
+
+    Parameters:
+        close: Series (or array) of closing prices
+        spec: sequence of (name, parameters) pairs, e.g. ('sma', (10, 20)),
+            ('macd', ((12, 26, 9),)) or ('bbands', ((20, 2.0),))
+
+    Return:
+        DataFrame with the close's index and one column per output, named
+        like sma_10, rsi_14, macd_12_26_9 / macds_ / macdh_, bbl_20_2.0 / bbm_ / bbu_
+    """
+    index = close.index if isinstance(close, pd.Series) else None
+    values = np.asarray(close, dtype=float)
+    sums = _PrefixSums(values)
+    emas = {}
+
+    def cached_ema(length):
+        if length not in emas:
+            emas[length] = ema(values, length)
+        return emas[length]
+
+    columns = {}
+    for name, parameters in spec:
+        for params in parameters:
+            if name == 'sma':
+                columns[f'sma_{params}'] = sma(values, params, sums)
+            elif name == 'ema':
+                columns[f'ema_{params}'] = cached_ema(params)
+            elif name == 'wma':
+                columns[f'wma_{params}'] = wma(values, params, sums)
+            elif name == 'dema':
+                columns[f'dema_{params}'] = 2 * cached_ema(params) - ema(cached_ema(params), params)
+            elif name == 'rsi':
+                columns[f'rsi_{params}'] = rsi(values, params)
+            elif name == 'macd':
+                fast, slow, signal_length = params
+                macd = cached_ema(fast) - cached_ema(slow)
+                signal_line = ema(macd, signal_length)
+                suffix = f'{fast}_{slow}_{signal_length}'
+                columns[f'macd_{suffix}'] = macd
+                columns[f'macds_{suffix}'] = signal_line
+                columns[f'macdh_{suffix}'] = macd - signal_line
+            elif name == 'bbands':
+                length, width = params
+                middle = sma(values, length, sums)
+                band = width * rolling_std(values, length, 0, sums)
+                suffix = f'{length}_{width}'
+                columns[f'bbl_{suffix}'] = middle - band
+                columns[f'bbm_{suffix}'] = middle
+                columns[f'bbu_{suffix}'] = middle + band
+            else:
+                raise ValueError(f"Unknown indicator: {name}")
+
+    return pd.DataFrame(columns, index=index)
+
+
+def get_indicators(df, ticker, spec=DEFAULT_INDICATORS):
+    """
+    Indicator set of a ticker's OHLCV frame, cached per series version
+    (ticker, first and last date, length, last close) so reruns and other
+    sessions reuse it. The caller's frame is not modified
+    """
+    if df.empty:
+        return compute_indicators(df['Close'], spec)
+
+    first, last = df['Date'].iloc[[0, -1]] if 'Date' in df else df.index[[0, -1]]
+    key = (ticker, first, last, len(df), float(df['Close'].iloc[-1]), spec)
+    return _indicator_cache.get_or_compute(key, lambda: compute_indicators(df['Close'], spec))
+
+
+def screen_indicators(tickers, start=None, end=None, spec=DEFAULT_INDICATORS, store=None):
+    """
+    Latest value of every indicator for each ticker, read from the price store
+    without Streamlit, one row per ticker
+    """
+    from price_store import get_store, HISTORY_START
+
+    store = store or get_store()
+    rows = {}
+    for ticker in tickers:
+        df = store.load(ticker, start or HISTORY_START, end or date.today())
+        if df.empty:
+            continue
+        indicators = compute_indicators(df['Close'], spec)
+        rows[ticker] = pd.concat([df[['Close']].iloc[-1], indicators.iloc[-1]])
+    return pd.DataFrame.from_dict(rows, orient='index')
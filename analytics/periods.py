@@ -0,0 +1,207 @@
+"""
+ASX trading calendar and the period index behind every weekly, monthly,
+quarterly and annual aggregate.
+
+A PeriodIndex holds, per frequency, the offsets at which a series' bars
+start a new period. OHLCV aggregates of a period are then one reduceat pass
+per column: open of the first bar, high/low extremes, close of the last bar,
+summed volume. Periods are Monday-to-Sunday weeks, calendar months, quarters
+and years, the same buckets the return-distribution page truncates dates to.
+Each period is labelled with its last bar's date and marked complete when its
+bars span the first to the last ASX session the calendar schedules in it, so
+a week ending on the Thursday before Good Friday is complete, and the current
+week and a week the series starts halfway through are not. Indexes are
+cached per series version, so every page and frequency shares one.
+"""
+from datetime import date, timedelta
+from functools import lru_cache
+
+import numpy as np
+
+from lazy_imports import lazy_import
+from ttl_cache import get_cache
+
+pd = lazy_import('pandas')
+
+FREQUENCIES = ('weekly', 'monthly', 'quarterly', 'annual')
+
+# Periods per year, for annualising statistics of each frequency
+PERIODS_PER_YEAR = {'daily': 252, 'weekly': 52, 'monthly': 12, 'quarterly': 4, 'annual': 1}
+
+PERIOD_INDEX_TTL = 6 * 60 * 60
+
+
+def _easter(year):
+    """Easter Sunday of a Gregorian year (anonymous Gregorian algorithm)"""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = divmod(b, 4)
+    g = (b - (b + 8) // 25 + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _weekdays_from(day, count):
+    """The first `count` weekdays on or after day"""
+    days = []
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+@lru_cache(maxsize=None)
+def asx_holidays(year):
+    """
+    ASX market holidays of a year under the current rules: New Year's Day and
+    Australia Day move to Monday from a weekend, Christmas and Boxing Day take
+    the first two weekdays from 25 December, Anzac Day is not moved
+    """
+    easter = _easter(year)
+    holidays = {
+        _weekdays_from(date(year, 1, 1), 1)[0],
+        _weekdays_from(date(year, 1, 26), 1)[0],
+        easter - timedelta(days=2),
+        easter + timedelta(days=1),
+        date(year, 6, 8) + timedelta(days=(0 - date(year, 6, 8).weekday()) % 7),
+        *_weekdays_from(date(year, 12, 25), 2),
+    }
+    anzac = date(year, 4, 25)
+    if anzac.weekday() < 5:
+        holidays.add(anzac)
+    return frozenset(holidays)
+
+
+def asx_sessions(start, end):
+    """Trading days of the ASX from start to end inclusive, as datetime64[D]"""
+    days = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1)
+    weekday = (days.astype(np.int64) + 3) % 7 < 5
+    holidays = np.array(sorted(day for year in range(start.year, end.year + 1) for day in asx_holidays(year)),
+                        dtype='datetime64[D]')
+    return days[weekday & ~np.isin(days, holidays)]
+
+
+def period_ids(days, frequency):
+    """
+    Ordinal of the period each datetime64[D] day falls in: weeks since the
+    Monday before 1970-01-01, or months, quarters or years since 1970
+    """
+    days = np.asarray(days, dtype='datetime64[D]')
+    if frequency == 'weekly':
+        return (days.astype(np.int64) + 3) // 7
+    months = days.astype('datetime64[M]').astype(np.int64)
+    if frequency == 'monthly':
+        return months
+    if frequency == 'quarterly':
+        return months // 3
+    if frequency == 'annual':
+        return months // 12
+    raise ValueError(f"Unknown frequency {frequency!r}; expected one of {FREQUENCIES}")
+
+
+class PeriodIndex:
+    """Bar-to-period offsets of one date-sorted series, built once per frequency"""
+
+    def __init__(self, dates):
+        self.days = np.asarray(dates, dtype='datetime64[D]')
+        self._starts = {}
+        self._complete = {}
+
+    def __len__(self):
+        return len(self.days)
+
+    def starts(self, frequency):
+        """Offset of the first bar of every period"""
+        if frequency not in self._starts:
+            ids = period_ids(self.days, frequency)
+            boundaries = np.r_[True, ids[1:] != ids[:-1]] if len(ids) else np.zeros(0, dtype=bool)
+            self._starts[frequency] = np.flatnonzero(boundaries)
+        return self._starts[frequency]
+
+    def stops(self, frequency):
+        """Offset one past the last bar of every period"""
+        return np.r_[self.starts(frequency)[1:], len(self.days)].astype(np.int64)
+
+    def labels(self, frequency):
+        """Date of the last bar of every period"""
+        return self.days[self.stops(frequency) - 1]
+
+    def complete(self, frequency):
+        """
+        Whether each period's bars run from the first to the last ASX session
+        scheduled in it, so a series starting mid-period or the period in
+        progress is not complete
+        """
+        if frequency not in self._complete:
+            first, last = self.days[self.starts(frequency)], self.labels(frequency)
+            if len(last) == 0:
+                self._complete[frequency] = np.zeros(0, dtype=bool)
+            else:
+                # Sessions from a year before the first period through a year
+                # past the last one, so both ends are whole periods
+                sessions = asx_sessions(first[0].astype(date) - timedelta(days=400),
+                                        last[-1].astype(date) + timedelta(days=400))
+                session_ids = period_ids(sessions, frequency)
+                boundaries = session_ids[1:] != session_ids[:-1]
+                period_first = sessions[np.r_[True, boundaries]]
+                period_last = sessions[np.r_[boundaries, True]]
+                position = np.searchsorted(period_ids(period_last, frequency), period_ids(last, frequency))
+                position = np.minimum(position, len(period_last) - 1)
+                self._complete[frequency] = (first <= period_first[position]) & (last >= period_last[position])
+        return self._complete[frequency]
+
+    def reduce(self, values, frequency, how):
+        """
+        Aggregate of values over every period in one pass: 'first', 'last',
+        'max', 'min' or 'sum'
+        """
+        values = np.asarray(values, dtype=float)
+        if how == 'first':
+            return values[self.starts(frequency)]
+        if how == 'last':
+            return values[self.stops(frequency) - 1]
+        ufunc = {'max': np.fmax, 'min': np.fmin, 'sum': np.add}[how]
+        if how == 'sum':
+            values = np.nan_to_num(values)
+        return ufunc.reduceat(values, self.starts(frequency)) if len(values) else values
+
+    def resample_ohlcv(self, df, frequency):
+        """
+        OHLCV bars of a frequency from a frame with Open/High/Low/Close/Volume
+        columns in the index's row order, indexed by period label, with the
+        number of bars and the calendar completeness of each period
+        """
+        columns = {
+            'Open': self.reduce(df['Open'], frequency, 'first'),
+            'High': self.reduce(df['High'], frequency, 'max'),
+            'Low': self.reduce(df['Low'], frequency, 'min'),
+            'Close': self.reduce(df['Close'], frequency, 'last'),
+            'Volume': self.reduce(df['Volume'], frequency, 'sum'),
+            'Sessions': np.diff(np.r_[self.starts(frequency), len(self.days)]),
+            'Complete': self.complete(frequency),
+        }
+        return pd.DataFrame(columns, index=pd.DatetimeIndex(self.labels(frequency), name='Date'))
+
+
+def period_index(key, dates):
+    """PeriodIndex of a series, cached under key (its version) when one is given"""
+    if key is None:
+        return PeriodIndex(dates)
+    cache = get_cache('period_index', ttl=PERIOD_INDEX_TTL, maxsize=128)
+    return cache.get_or_compute(tuple(key), lambda: PeriodIndex(dates))
+
+
+def resample_ohlcv(df, frequency, key=None):
+    """
+    Weekly, monthly, quarterly or annual OHLCV bars of a date-indexed daily
+    frame, from the series' cached period index and resampled frames
+    """
+    if key is None:
+        return PeriodIndex(df.index).resample_ohlcv(df, frequency)
+    cache = get_cache('resampled_ohlcv', ttl=PERIOD_INDEX_TTL, maxsize=128)
+    return cache.get_or_compute(tuple(key) + (frequency,),
+                                lambda: period_index(key, df.index).resample_ohlcv(df, frequency))
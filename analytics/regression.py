@@ -0,0 +1,172 @@
+"""
+Linear price trend with a 95% prediction band.
+
+The least-squares line is solved in closed form from six running sums
+(count, Σx, Σy, Σx², Σxy, Σy²) of day number x and close y, so slope,
+intercept, R², standard errors and the band come out of one vectorized pass.
+The sums come from the series index (analytics.series_index), which makes
+refitting any date range of a cached series two lookups and a difference
+instead of a refit over the window, and fitting a rolling or expanding trend
+at every date is O(n) rather than one refit per date.
+"""
+from datetime import date
+
+import numpy as np
+
+from analytics.series_index import date_ordinals, series_index
+from lazy_imports import lazy_import
+
+pd = lazy_import('pandas')
+stats = lazy_import('scipy.stats')
+
+# Two-sided 95% normal quantile used for the prediction band
+BAND_Z = 1.96
+
+# Default rolling trend window (about a trading year) and the fewest bars an
+# expanding trend is reported from
+TREND_WINDOW = 252
+TREND_MIN_PERIODS = 20
+
+
+class TrendFit:
+    """
+    Ordinary least squares fit of y = intercept + slope * x with its inference.
+    Built from arrays of sums it holds one fit per window, element-wise
+    """
+
+    def __init__(self, n, sx, sy, sxx, sxy, syy, x_shift=0.0, y_shift=0.0):
+        # Sums are of x - x_shift and y - y_shift; slope and spreads do not
+        # depend on the shift, the means are shifted back
+        self.n = n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            x_mean, y_mean = sx / n, sy / n
+            self.ssx = sxx - sx * x_mean
+            ssy = syy - sy * y_mean
+            sxy_c = sxy - sx * y_mean
+
+            self.slope = sxy_c / self.ssx
+            self.x_mean = x_mean + x_shift
+            self.y_mean = y_mean + y_shift
+            self.intercept = self.y_mean - self.slope * self.x_mean
+
+            sse = np.maximum(ssy - self.slope * sxy_c, 0.0)
+            self.r_squared = np.where(ssy > 0, 1.0 - sse / ssy, 1.0)[()]
+            self.mse = np.where(n > 2, sse / (n - 2), np.nan)[()]
+            self.se_slope = np.sqrt(self.mse / self.ssx)
+            self.se_intercept = np.sqrt(self.mse * (1.0 / n + self.x_mean ** 2 / self.ssx))
+
+    @property
+    def t_slope(self):
+        return self.slope / self.se_slope
+
+    @property
+    def p_slope(self):
+        """Two-sided p-value of the slope against no trend"""
+        return 2 * stats.t.sf(abs(self.t_slope), self.n - 2)
+
+    def predict(self, x):
+        return self.intercept + self.slope * np.asarray(x, dtype=float)
+
+    def prediction_se(self, x):
+        """Standard error of a new observation at x"""
+        x = np.asarray(x, dtype=float)
+        return np.sqrt(self.mse * (1 + 1 / self.n + (x - self.x_mean) ** 2 / self.ssx))
+
+    def band(self, x, z=BAND_Z):
+        """(predicted, lower, upper) at x"""
+        predicted = self.predict(x)
+        half_width = z * self.prediction_se(x)
+        return predicted, predicted - half_width, predicted + half_width
+
+    def band_position(self, x, y, z=BAND_Z):
+        """Where y sits in the band at x: 0 on the line, +1/-1 on the upper/lower bound"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (np.asarray(y, dtype=float) - self.predict(x)) / (z * self.prediction_se(x))
+
+
+def fit_range(view, start=0, stop=None):
+    """TrendFit over rows [start, stop) of an IndexView, from two prefix rows"""
+    index = view.index
+    return TrendFit(*view.sums(start, stop)[:6], x_shift=index.x_shift, y_shift=index.y_shift)
+
+
+def rolling_fit(view, window, start=0, stop=None):
+    """
+    TrendFit of the trailing `window` rows at every row in [start, stop) of an
+    IndexView, element-wise; window=None fits the expanding window from start
+    """
+    stop = len(view) if stop is None else stop
+    sums = view.window_sums(window or stop - start, start, stop)[:6, :, 0]
+    return TrendFit(*sums, x_shift=view.index.x_shift, y_shift=view.index.y_shift)
+
+
+def fit_trend(key, dates, close, volume=None):
+    """
+    TrendFit of close on day number, from the series index cached under key
+    (no caching when key is None). A date range of a cached series is
+    located in it and fitted without touching its rows
+    """
+    with series_index(key, dates, close, volume) as view:
+        return fit_range(view)
+
+
+def rolling_trend(key, dates, close, window=None, min_periods=None, volume=None):
+    """
+    Slope, R-squared, slope p-value and band position of the trend fitted at
+    every date over the trailing `window` bars (expanding when None), from the
+    cached regression sums: O(n) for the whole series instead of one refit per
+    date. Dates with fewer than min_periods closes in their window are NaN
+    """
+    min_periods = min_periods or window or TREND_MIN_PERIODS
+    with series_index(key, dates, close, volume) as view:
+        fit = rolling_fit(view, window)
+
+    columns = {
+        'Slope': fit.slope,
+        'R_Squared': fit.r_squared,
+        'Slope_P_Value': fit.p_slope,
+        'Band_Position': fit.band_position(date_ordinals(dates), close),
+    }
+    enough = fit.n >= max(min_periods, 3)
+    return pd.DataFrame({name: np.where(enough, values, np.nan) for name, values in columns.items()},
+                        index=pd.Index(dates, name='Date'))
+
+
+def screen_trends(tickers, start=None, end=None, window=TREND_WINDOW, store=None):
+    """
+    Latest rolling and full-history trend of each ticker, read from the price
+    store without Streamlit, one row per ticker
+    """
+    from price_store import get_store, HISTORY_START
+
+    store = store or get_store()
+    rows = {}
+    for ticker in tickers:
+        df = store.load(ticker, start or HISTORY_START, end or date.today())
+        if len(df) < 3:
+            continue
+        full = fit_trend(None, df.index, df['Close'])
+        latest = rolling_trend(None, df.index, df['Close'], window).iloc[-1]
+        rows[ticker] = {
+            'Close': df['Close'].iloc[-1],
+            'Trend Slope': full.slope,
+            'Trend R-squared': full.r_squared,
+            **{f'{window}d Trend {name.replace("_", " ")}': value for name, value in latest.items()},
+        }
+    return pd.DataFrame.from_dict(rows, orient='index')
+
+
+def perform_linear_regression(df, fit=None):
+    """Perform linear regression on the closing price."""
+    fit = fit or fit_trend(None, df['Date'], df['Close'])
+
+    # Day number of each date, the regressor
+    df['Date_Numeric'] = date_ordinals(df['Date'])
+
+    # Fitted line and 95% prediction interval
+    predicted, lower, upper = fit.band(df['Date_Numeric'].values)
+    df['Predicted_Price'] = predicted
+    df['Upper_Bound'] = upper
+    df['Lower_Bound'] = lower
+
+    return df, fit.r_squared, fit.slope
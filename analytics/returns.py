@@ -0,0 +1,199 @@
+"""
+Period returns and their distribution statistics.
+
+Returns are built as lazy Polars plans over a typed, date-sorted price base;
+the distribution statistics come from one mergeable moments aggregate. Polars
+and SciPy are loaded lazily, on first use.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+from analytics.density import histogram, kde
+from analytics.rolling import rolling_std
+from analytics.stats import Moments
+from lazy_imports import lazy_import
+from ttl_cache import get_cache
+
+pl = lazy_import('polars')
+stats = lazy_import('scipy.stats')
+
+PERIODS = ['Daily', 'Weekly', 'Monthly']
+
+# Polars truncation unit of each period bucket: Monday-to-Sunday weeks and
+# calendar months, the buckets of analytics.periods
+PERIOD_UNITS = {'weekly': '1w', 'monthly': '1mo'}
+
+RETURNS_TTL = 60 * 60
+
+
+def base_prices(pl_df: pl.DataFrame) -> pl.LazyFrame:
+    """
+    Typed, date-sorted closing prices shared by every period's query plan.
+    Date stays a native pl.Date from here to the chart labels
+    """
+    return pl_df.lazy().select([
+        pl.col('Date').cast(pl.Date),
+        pl.col('Close').cast(pl.Float64)
+    ]).sort('Date')
+
+
+def returns_plan(prices: pl.LazyFrame, period: str = 'daily') -> pl.LazyFrame:
+    """
+    Lazy query for the returns of one period
+    period: 'daily', 'weekly', or 'monthly'
+    """
+    if period == 'daily':
+        return prices.select([
+            pl.col('Date'),
+            pl.col('Close').pct_change().fill_null(0).alias('Return')
+        ])
+
+    # Last close of each ISO week or calendar month; the input is sorted, so
+    # groups keep date order without a re-sort
+    grouped = prices.group_by(
+        pl.col('Date').dt.truncate(PERIOD_UNITS[period]).alias('Period'),
+        maintain_order=True
+    ).agg([
+        pl.col('Close').last().alias('Price'),
+        pl.col('Date').last().alias('Date')
+    ])
+
+    return grouped.select([
+        pl.col('Date'),
+        pl.col('Price').pct_change().fill_null(0).alias('Return')
+    ])
+
+
+def calculate_returns(pl_df: pl.DataFrame, period: str = 'daily') -> pl.DataFrame:
+    """
+    Calculate returns for different periods
+    period: 'daily', 'weekly', or 'monthly'
+    """
+    return returns_plan(base_prices(pl_df), period).collect()
+
+
+def calculate_all_returns(pl_df: pl.DataFrame) -> dict:
+    """
+    Returns of every period collected together, so Polars optimizes the three
+    plans as one and evaluates the shared typed, sorted base only once
+    """
+    prices = base_prices(pl_df)
+    frames = pl.collect_all([returns_plan(prices, period.lower()) for period in PERIODS])
+    return dict(zip(PERIODS, frames))
+
+
+def period_returns(key, pl_df: pl.DataFrame) -> dict:
+    """
+    Returns of every period from one calculate_all_returns call, cached under
+    key (the series version; no caching when key is None), so whichever
+    period is asked for first collects all three
+    """
+    if key is None:
+        return calculate_all_returns(pl_df)
+    cache = get_cache('period_returns', ttl=RETURNS_TTL, maxsize=64)
+    return cache.get_or_compute(tuple(key), lambda: calculate_all_returns(pl_df))
+
+
+def return_values(returns: pl.DataFrame) -> np.ndarray:
+    """
+    Returns as a NumPy array for SciPy. A null-free Float64 column converts
+    without a copy
+    """
+    return returns.get_column('Return').to_numpy()
+
+
+def analyze_returns_distribution(returns: pl.DataFrame, period: str) -> dict:
+    """
+    Analyze the distribution of returns with proper period scaling
+    """
+    returns_array = return_values(returns)
+
+    # Scale factors for different periods
+    if period == 'Weekly':
+        scale_factor = 52  # weeks in a year
+    elif period == 'Monthly':
+        scale_factor = 12  # months in a year
+    else:  # Daily
+        scale_factor = 252  # trading days in a year
+
+    # All moments from one aggregate instead of a pass per statistic
+    moments = Moments.from_array(returns_array)
+    mean_return = moments.mean
+    std_dev = moments.std(ddof=0)
+
+    # Annualize mean and std dev
+    annualized_mean = mean_return * scale_factor
+    annualized_std = std_dev * np.sqrt(scale_factor)
+
+    basic_stats = {
+        f'{period} Mean (%)': float(mean_return * 100),
+        f'Annualized Mean (%)': float(annualized_mean * 100),
+        f'{period} Std Dev (%)': float(std_dev * 100),
+        'Annualized Volatility (%)': float(annualized_std * 100),
+        f'{period} Minimum (%)': float(moments.min * 100),
+        f'{period} Maximum (%)': float(moments.max * 100),
+        'Skewness': float(moments.skew),
+        'Excess Kurtosis': float(moments.kurtosis)
+    }
+
+    # Normality tests, Jarque-Bera comes straight from the skewness and kurtosis
+    shapiro_stat, shapiro_p = stats.shapiro(returns_array)
+    jb_stat, jb_p = moments.jarque_bera()
+
+    normality_tests = {
+        'Shapiro-Wilk p-value': shapiro_p,
+        'Jarque-Bera p-value': jb_p
+    }
+
+    return {'basic_stats': basic_stats, 'normality_tests': normality_tests}
+
+
+def compute_distribution_views(returns: pl.DataFrame, period: str, ticker: str = None) -> dict:
+    """
+    Compute the arrays behind the distribution charts: KDE, QQ plot and rolling
+    volatility. These are the expensive parts on long histories, so they are
+    computed once per period and cached with the analysis
+    """
+    returns_array = return_values(returns)
+    dates = returns.get_column('Date').to_numpy()
+
+    # Histogram bars and KDE, both binned here so the browser gets 50 bars and
+    # a 100-point curve instead of the raw returns
+    hist_x, hist_widths, hist_density = histogram(returns_array, bins=50)
+    kde_x = np.linspace(min(returns_array), max(returns_array), 100)
+
+    # QQ Plot
+    qq = stats.probplot(returns_array)
+
+    # Rolling Volatility, from the ticker's cached rolling sums
+    series_key = (ticker, 'Return', period) if ticker else None
+    rolling_vol = rolling_std(
+        series_key, dates, returns_array, window=20 if period == 'Daily' else 5
+    ) * np.sqrt(252 if period == 'Daily' else 52 if period == 'Weekly' else 12)
+
+    return {
+        'returns_array': returns_array,
+        'dates': dates,
+        'hist': (hist_x, hist_widths, hist_density),
+        'kde_x': kde_x,
+        'kde_y': kde(returns_array, kde_x),
+        'qq': qq,
+        'rolling_vol': rolling_vol
+    }
+
+
+def analyze_period(pl_df: pl.DataFrame, period: str, ticker: str = None, key=None) -> dict:
+    """
+    Returns, statistics and chart arrays for one period. With a series key the
+    returns come from the periods collected together under it
+    """
+    if key is None:
+        returns = calculate_returns(pl_df, period.lower())
+    else:
+        returns = period_returns(key, pl_df)[period]
+    return {
+        'returns': returns,
+        'analysis': analyze_returns_distribution(returns, period),
+        'views': compute_distribution_views(returns, period, ticker)
+    }
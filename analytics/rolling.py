@@ -0,0 +1,247 @@
+"""
+Rolling-window statistics served from cached prefix sums.
+
+A state keeps prefix sums of per-bar terms (count, sum, sum of squares, or the
+co-moments of a pair of series) for one series key such as
+(ticker, 'Close', 'daily'). Every window length over any date range the state
+covers is then a difference of two prefix rows, so changing the window or
+re-rendering a page costs O(n) array arithmetic with no recomputation, and
+new bars from a store refresh are appended in O(1) each (amortised) instead of
+rebuilding the series. States live in a process-wide cache shared by all
+pages and sessions.
+"""
+import threading
+
+import numpy as np
+
+from analytics.correlation import _corr_from_sums, _masked
+from ttl_cache import get_cache
+
+# Rolling states are kept for six hours, long enough to span a trading session
+ROLLING_STATE_TTL = 6 * 60 * 60
+
+
+def _as_ns(dates):
+    """Dates of any numpy/pandas flavour as int64 nanoseconds"""
+    return np.asarray(dates, dtype='datetime64[ns]').astype(np.int64)
+
+
+class PrefixSums:
+    """
+    Prefix sums of per-row terms over a growing, date-ordered series.
+
+    Subclasses define the terms of a block of rows in _terms(); rows are kept
+    as well, so a later request can be checked against the bars the sums were
+    built from.
+    """
+
+    n_terms = 0
+
+    def __init__(self, dates, rows):
+        rows = self._as_rows(rows)
+        self.lock = threading.Lock()
+        self._n = 0
+        self._dates = np.empty(0, dtype=np.int64)
+        self._rows = np.empty((0, rows.shape[1]))
+        self._prefix = np.zeros((self.n_terms, 1, self._term_columns(rows.shape[1])))
+        self.append(dates, rows)
+
+    def __len__(self):
+        return self._n
+
+    @staticmethod
+    def _as_rows(rows):
+        rows = np.asarray(rows, dtype=float)
+        return rows.reshape(-1, 1) if rows.ndim == 1 else rows
+
+    def _term_columns(self, n_columns):
+        return n_columns
+
+    def _terms(self, rows):
+        raise NotImplementedError
+
+    def _reserve(self, size):
+        capacity = len(self._dates)
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity, 256)
+
+        dates = np.empty(capacity, dtype=np.int64)
+        dates[:self._n] = self._dates[:self._n]
+        rows = np.empty((capacity, self._rows.shape[1]))
+        rows[:self._n] = self._rows[:self._n]
+        prefix = np.empty((self.n_terms, capacity + 1, self._prefix.shape[2]))
+        prefix[:, :self._n + 1] = self._prefix[:, :self._n + 1]
+        self._dates, self._rows, self._prefix = dates, rows, prefix
+
+    def append(self, dates, rows):
+        """Add bars newer than the last one, oldest first"""
+        dates, rows = _as_ns(dates), self._as_rows(rows)
+        if len(dates) == 0:
+            return
+        if self._n and dates[0] <= self._dates[self._n - 1]:
+            raise ValueError("Appended bars must be newer than the last stored bar")
+
+        n, k = self._n, len(dates)
+        self._reserve(n + k)
+        self._dates[n:n + k] = dates
+        self._rows[n:n + k] = rows
+        self._prefix[:, n + 1:n + k + 1] = self._prefix[:, n:n + 1] + np.cumsum(self._terms(rows), axis=1)
+        self._n += k
+
+    def locate(self, dates, rows):
+        """
+        (start, stop) of the given bars within the state, or None when they
+        are not a contiguous run of it with the same first and last values
+        """
+        dates, rows = _as_ns(dates), self._as_rows(rows)
+        if len(dates) == 0:
+            return None
+
+        start = int(np.searchsorted(self._dates[:self._n], dates[0]))
+        stop = start + len(dates)
+        if stop > self._n or self._dates[start] != dates[0] or self._dates[stop - 1] != dates[-1]:
+            return None
+        if not np.array_equal(self._rows[[start, stop - 1]], rows[[0, -1]], equal_nan=True):
+            return None
+        return start, stop
+
+    def sync(self, dates, rows):
+        """
+        Append the bars newer than the state and locate the whole request.
+        Returns None when the request does not continue the stored series
+        """
+        dates, rows = _as_ns(dates), self._as_rows(rows)
+        newer = dates > self._dates[self._n - 1] if self._n else np.ones(len(dates), dtype=bool)
+        if newer.all() or self.locate(dates[~newer], rows[~newer]) is None:
+            return None
+        self.append(dates[newer], rows[newer])
+        return self.locate(dates, rows)
+
+    def window_sums(self, window, start=0, stop=None):
+        """
+        Sums of every term over the trailing `window` rows of each position in
+        [start, stop), windows clipped at start as if the series began there
+        """
+        stop = self._n if stop is None else stop
+        hi = np.arange(start + 1, stop + 1)
+        lo = np.maximum(hi - window, start)
+        return self._prefix[:, hi] - self._prefix[:, lo]
+
+
+class SeriesSums(PrefixSums):
+    """Prefix count, sum and sum of squares of one series, NaNs skipped"""
+
+    n_terms = 3
+
+    def __init__(self, dates, values):
+        # Sums are taken around the first value so squares of large prices do
+        # not cancel catastrophically in the variance
+        values = np.asarray(values, dtype=float)
+        finite = values[np.isfinite(values)]
+        self.shift = finite[0] if len(finite) else 0.0
+        super().__init__(dates, values)
+
+    def _terms(self, rows):
+        valid = ~np.isnan(rows)
+        x = np.where(valid, rows - self.shift, 0.0)
+        return np.stack([valid.astype(float), x, x * x])
+
+    def mean(self, window, min_periods=None, start=0, stop=None):
+        """Rolling mean, NaN where the window holds fewer than min_periods values"""
+        count, s1, _ = self.window_sums(window, start, stop)[:, :, 0]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = s1 / count + self.shift
+        return np.where(count >= (window if min_periods is None else min_periods), mean, np.nan)
+
+    def std(self, window, ddof=1, min_periods=None, start=0, stop=None):
+        """Rolling standard deviation, as pandas rolling(window).std(ddof)"""
+        count, s1, s2 = self.window_sums(window, start, stop)[:, :, 0]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            variance = np.maximum(s2 - s1 * s1 / count, 0.0) / (count - ddof)
+        enough = (count >= (window if min_periods is None else min_periods)) & (count > ddof)
+        return np.where(enough, np.sqrt(variance), np.nan)
+
+
+class ComomentSums(PrefixSums):
+    """
+    Prefix co-moment sums of several series against one target series, over
+    the days on which both have a value. The target is the last column
+    """
+
+    n_terms = 6
+
+    def _term_columns(self, n_columns):
+        return n_columns - 1
+
+    def _terms(self, rows):
+        x, mx = _masked(rows[:, :-1])
+        y, my = _masked(rows[:, -1:])
+        m = mx * my
+        x, y = x * m, y * m
+        return np.stack([m, x, np.broadcast_to(y, x.shape), x * x, np.broadcast_to(y * y, x.shape), x * y])
+
+    def correlation(self, window, min_periods=None, start=0, stop=None):
+        """Rolling correlation of every series against the target"""
+        sums = self.window_sums(window, start, stop)
+        return _corr_from_sums(*sums, window if min_periods is None else min_periods)
+
+
+def _state(key, kind, dates, rows):
+    """
+    (state, start, stop) for the given bars: the cached state of `key` when it
+    covers or continues them, a freshly built one otherwise. The state's lock
+    is held on return and must be released by the caller
+    """
+    if key is None:
+        state = kind(dates, rows)
+        state.lock.acquire()
+        return state, 0, len(state)
+
+    states = get_cache('rolling_state', ttl=ROLLING_STATE_TTL, maxsize=256)
+    state = states.get((kind.__name__,) + tuple(key))
+    if state is not None:
+        state.lock.acquire()
+        located = state.sync(dates, rows)
+        if located is not None:
+            return (state,) + located
+        state.lock.release()
+
+    state = kind(dates, rows)
+    states.set((kind.__name__,) + tuple(key), state)
+    state.lock.acquire()
+    return state, 0, len(state)
+
+
+def rolling_mean(key, dates, values, window, min_periods=None):
+    """
+    Rolling mean of a series, served from the prefix sums cached under key
+    (no caching when key is None)
+    """
+    state, start, stop = _state(key, SeriesSums, dates, values)
+    try:
+        return state.mean(window, min_periods, start, stop)
+    finally:
+        state.lock.release()
+
+
+def rolling_std(key, dates, values, window, ddof=1, min_periods=None):
+    """Rolling standard deviation of a series, served like rolling_mean"""
+    state, start, stop = _state(key, SeriesSums, dates, values)
+    try:
+        return state.std(window, ddof, min_periods, start, stop)
+    finally:
+        state.lock.release()
+
+
+def rolling_correlation(key, dates, series, target, window, min_periods=None):
+    """
+    Rolling correlation of each column of `series` (2-D array) against
+    `target`, served from the co-moment prefix sums cached under key
+    """
+    rows = np.column_stack([np.asarray(series, dtype=float), np.asarray(target, dtype=float)])
+    state, start, stop = _state(key, ComomentSums, dates, rows)
+    try:
+        return state.correlation(window, min_periods, start, stop)
+    finally:
+        state.lock.release()
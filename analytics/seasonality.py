@@ -0,0 +1,292 @@
+"""
+Calendar seasonality and autocorrelation of prices. Seasonal decomposition
+lives in analytics.decomposition.
+
+Calendar statistics (month, day of week, turn of month, quarter) are group
+sums of daily returns taken with np.bincount in one pass, with the t-test of
+every group vectorized over the sums. Autocorrelation is computed once per
+series up to MAX_ACF_LAGS: the ACF by FFT, the PACF of every lag by one
+Levinson-Durbin recursion and Ljung-Box statistics as a cumulative sum, so
+any lag count is a slice of the cached profile.
+
+pandas and SciPy are loaded lazily.
+"""
+from datetime import date
+
+import numpy as np
+
+from analytics.periods import period_ids
+from lazy_imports import lazy_import
+from ttl_cache import TTLCache
+
+pd = lazy_import('pandas')
+stats = lazy_import('scipy.stats')
+
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+               'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+DAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+QUARTER_NAMES = ['Q1', 'Q2', 'Q3', 'Q4']
+
+# Trading days (before, after) a month end counted as the turn of the month
+TURN_OF_MONTH_DAYS = (1, 3)
+
+# Autocorrelation profiles are computed once up to the page's largest lag
+# count and kept for an hour per series version
+MAX_ACF_LAGS = 100
+SUMMARY_LAGS = (1, 2, 5)
+LJUNG_BOX_LAGS = (10, 20)
+_acf_cache = TTLCache(ttl=60 * 60, maxsize=128)
+
+
+def _calendar(dates):
+    """Month number since 1970 and day of week (Monday = 0) of every date"""
+    days = np.asarray(dates, dtype='datetime64[D]')
+    weekdays = (days.astype(np.int64) + 3) % 7
+    return period_ids(days, 'monthly'), weekdays
+
+
+def _daily_returns(close):
+    close = np.asarray(close, dtype=float)
+    returns = np.full(len(close), np.nan)
+    returns[1:] = close[1:] / close[:-1] - 1
+    return returns
+
+
+def group_return_stats(returns, codes, labels):
+    """
+    Count, mean and standard deviation (in %) of returns in each group, and
+    the t-test of the group mean against zero, from one bincount pass over
+    the group sums. Groups are coded 0..len(labels)-1; NaN returns are skipped
+    """
+    valid = np.isfinite(returns)
+    returns, codes = returns[valid], codes[valid]
+    k = len(labels)
+
+    # Sums are taken around the overall mean so squares do not cancel
+    shift = returns.mean() if len(returns) else 0.0
+    deviations = returns - shift
+    count = np.bincount(codes, minlength=k).astype(float)
+    s1 = np.bincount(codes, deviations, minlength=k)
+    s2 = np.bincount(codes, deviations * deviations, minlength=k)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = s1 / count + shift
+        variance = np.maximum(s2 - s1 * s1 / count, 0.0) / (count - 1)
+        t_stat = mean / np.sqrt(variance / count)
+        p_value = 2 * stats.t.sf(np.abs(t_stat), count - 1)
+
+    return pd.DataFrame({
+        'Average_Return': mean * 100,
+        'Std_Return': np.sqrt(variance) * 100,
+        'T_Statistic': t_stat,
+        'P_Value': p_value,
+        'Sample_Size': count.astype(int),
+    }, index=pd.Index(labels))
+
+
+def calculate_monthly_patterns(stock_data):
+    """Calculate monthly statistics and patterns"""
+    months, _ = _calendar(stock_data.index)
+    month_of_year = months % 12
+
+    # Price statistics by calendar month, every month present
+    monthly_stats = stock_data['Close'].groupby(month_of_year + 1).agg([
+        'mean', 'std', 'min', 'max', 'count'
+    ]).reindex(range(1, 13)).rename_axis('Month').round(2)
+
+    # Daily returns within a month only: the first bar of a month is measured
+    # from the previous month's close, so it belongs to neither month
+    returns = _daily_returns(stock_data['Close'])
+    returns[1:][months[1:] != months[:-1]] = np.nan
+
+    # Count, mean and t-test of every month at once
+    seasonal_stats = group_return_stats(returns, month_of_year, MONTH_NAMES)
+    monthly_returns = pd.Series(seasonal_stats['Average_Return'].to_numpy(),
+                                index=pd.Index(range(1, 13), name='Month'), name='Return')
+    seasonal_stats = seasonal_stats.rename_axis('Month').reset_index()[
+        ['Month', 'Average_Return', 'T_Statistic', 'P_Value', 'Sample_Size']]
+
+    return monthly_stats, monthly_returns, seasonal_stats
+
+
+def calendar_effects(stock_data, turn_of_month=TURN_OF_MONTH_DAYS):
+    """
+    Daily return statistics by day of week, turn of month and quarter, as
+    {effect: DataFrame} in the layout of group_return_stats.
+
+    The turn of the month is the last `turn_of_month[0]` and first
+    `turn_of_month[1]` trading days of each month in the data. Quarter
+    statistics leave out returns measured across a quarter end
+    """
+    months, weekdays = _calendar(stock_data.index)
+    returns = _daily_returns(stock_data['Close'])
+
+    # Day of week; weekend rows only appear for markets that trade then
+    by_weekday = group_return_stats(returns, weekdays, DAY_NAMES)
+    by_weekday = by_weekday[by_weekday['Sample_Size'] > 0]
+
+    # Position of each bar from the start and the end of its month
+    new_month = np.r_[True, months[1:] != months[:-1]]
+    run = np.cumsum(new_month) - 1
+    starts = np.flatnonzero(new_month)
+    stops = np.r_[starts[1:], len(months)]
+    position = np.arange(len(months))
+    from_start, from_end = position - starts[run], stops[run] - 1 - position
+    at_turn = (from_end < turn_of_month[0]) | (from_start < turn_of_month[1])
+    by_turn = group_return_stats(returns, np.where(at_turn, 0, 1), ['Turn of Month', 'Rest of Month'])
+
+    quarters = period_ids(stock_data.index, 'quarterly')
+    quarter_returns = returns.copy()
+    quarter_returns[1:][quarters[1:] != quarters[:-1]] = np.nan
+    by_quarter = group_return_stats(quarter_returns, quarters % 4, QUARTER_NAMES)
+
+    return {'Day of Week': by_weekday, 'Turn of Month': by_turn, 'Quarter': by_quarter}
+
+
+def seasonality_summary(stock_data):
+    """
+    One flat row of a ticker's monthly t-tests and calendar effects, as the
+    screener and screen_seasonality report them
+    """
+    _, _, seasonal_stats = calculate_monthly_patterns(stock_data)
+    row = {}
+    for month in seasonal_stats.itertuples():
+        row[f'{month.Month} Avg Return (%)'] = month.Average_Return
+        row[f'{month.Month} T-Statistic'] = month.T_Statistic
+        row[f'{month.Month} P-Value'] = month.P_Value
+    row['Significant Months'] = int((seasonal_stats['P_Value'] < 0.05).sum())
+
+    for effect in calendar_effects(stock_data).values():
+        for label, group in effect.iterrows():
+            row[f'{label} Avg Return (%)'] = group['Average_Return']
+            row[f'{label} P-Value'] = group['P_Value']
+    return row
+
+
+def screen_seasonality(tickers, start=None, end=None, store=None):
+    """
+    Monthly and calendar-effect statistics for each ticker, read from the
+    price store without Streamlit, one row per ticker
+    """
+    from price_store import get_store, HISTORY_START
+
+    store = store or get_store()
+    rows = {}
+    for ticker in tickers:
+        df = store.load(ticker, start or HISTORY_START, end or date.today())
+        if len(df) < 3:
+            continue
+        rows[ticker] = seasonality_summary(df)
+    return pd.DataFrame.from_dict(rows, orient='index')
+
+
+def _fft_autocovariances(x):
+    """Autocovariance sums sum_t x_t x_(t+k) of a demeaned series at every lag, by FFT"""
+    n = len(x)
+    size = 1 << int(2 * n - 1).bit_length()
+    spectrum = np.fft.rfft(x, size)
+    return np.fft.irfft(spectrum * np.conj(spectrum), size)[:n]
+
+
+def _levinson_durbin_pacf(r, lags):
+    """
+    Partial autocorrelations at lags 0..lags from autocorrelations r, with one
+    Levinson-Durbin recursion instead of a Yule-Walker solve per lag
+    """
+    pacf = np.zeros(lags + 1)
+    pacf[0] = 1.0
+    phi = np.zeros(lags + 1)
+    error = r[0]
+    for k in range(1, lags + 1):
+        reflection = (r[k] - phi[1:k] @ r[k - 1:0:-1]) / error
+        phi[1:k] = phi[1:k] - reflection * phi[k - 1:0:-1]
+        phi[k] = reflection
+        pacf[k] = reflection
+        error *= 1 - reflection * reflection
+    return pacf
+
+
+def autocorrelation_profile(data, max_lags=MAX_ACF_LAGS):
+    """
+    ACF, PACF and Ljung-Box statistics of a series at every lag up to
+    max_lags (capped at half the sample, as statsmodels pacf requires).
+
+    The ACF is statsmodels' acf(), the PACF its default Yule-Walker pacf()
+    with autocovariances adjusted by n - k, and lb_stat/lb_pvalue those of
+    acorr_ljungbox at lags 1..max_lags, all from one FFT pass
+    """
+    x = np.asarray(data, dtype=float)
+    x = x[np.isfinite(x)]
+    n = len(x)
+    lags = max(min(max_lags, n // 2 - 1), 0)
+
+    sums = _fft_autocovariances(x - x.mean())[:lags + 1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        acf_values = sums / sums[0]
+        adjusted = sums / (n - np.arange(lags + 1))
+        pacf_values = _levinson_durbin_pacf(adjusted / adjusted[0], lags)
+
+        lag_range = np.arange(1, lags + 1)
+        lb_stat = n * (n + 2) * np.cumsum(acf_values[1:] ** 2 / (n - lag_range))
+    return {
+        'n': n,
+        'acf': acf_values,
+        'pacf': pacf_values,
+        'lb_stat': lb_stat,
+        'lb_pvalue': stats.chi2.sf(lb_stat, lag_range),
+    }
+
+
+def _profile(data, key):
+    """Profile up to MAX_ACF_LAGS, cached under key when one is given"""
+    if key is None:
+        return autocorrelation_profile(data)
+    return _acf_cache.get_or_compute(key, lambda: autocorrelation_profile(data))
+
+
+def autocorrelations(data, lags, key=None):
+    """
+    ACF and PACF values up to `lags` and the 95% white-noise band. With a key
+    (the series version) every lag count is sliced from one cached profile
+    """
+    profile = _profile(data, key)
+    conf_int = 1.96 / np.sqrt(profile['n'])
+    return profile['acf'][:lags + 1], profile['pacf'][:lags + 1], conf_int
+
+
+def ljung_box(data, lags, key=None):
+    """Ljung-Box statistic and p-value at each of the given lags, cached like autocorrelations"""
+    profile = _profile(data, key)
+    lags = [lag for lag in np.atleast_1d(lags) if 1 <= lag <= len(profile['lb_stat'])]
+    return pd.DataFrame({
+        'lb_stat': profile['lb_stat'][np.subtract(lags, 1)],
+        'lb_pvalue': profile['lb_pvalue'][np.subtract(lags, 1)],
+    }, index=pd.Index(lags, name='Lag'))
+
+
+def autocorrelation_summary(data, key=None):
+    """Short-lag autocorrelations and Ljung-Box p-values of a return series as one flat row"""
+    profile = _profile(data, key)
+    row = {f'ACF Lag {lag}': profile['acf'][lag] if lag < len(profile['acf']) else np.nan
+           for lag in SUMMARY_LAGS}
+    p_values = profile['lb_pvalue']
+    for lag in LJUNG_BOX_LAGS:
+        row[f'Ljung-Box({lag}) P-Value'] = p_values[lag - 1] if lag <= len(p_values) else np.nan
+    return row
+
+
+def screen_autocorrelation(tickers, start=None, end=None, store=None):
+    """
+    Daily return autocorrelation summary for each ticker, read from the price
+    store without Streamlit, one row per ticker
+    """
+    from price_store import get_store, HISTORY_START
+
+    store = store or get_store()
+    rows = {}
+    for ticker in tickers:
+        df = store.load(ticker, start or HISTORY_START, end or date.today())
+        if len(df) < 3:
+            continue
+        rows[ticker] = autocorrelation_summary(df['Close'].pct_change().dropna())
+    return pd.DataFrame.from_dict(rows, orient='index')
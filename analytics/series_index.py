@@ -0,0 +1,129 @@
+"""
+Per-series index for instant date-range slicing.
+
+An index keeps a series' bar dates as sorted int64 nanoseconds next to prefix
+sums of count, day number x, close y, x², xy, y² and volume. Any contiguous
+date range is then located by binary search in O(log n), and its aggregates,
+such as the regression sums or the average volume, are the difference of two
+prefix rows in O(1). Indexes are cached per series like the rolling states
+and extended in place when new bars arrive. Dragging a date slider over
+decades of bars neither builds per-row Python dates nor rescans the range.
+"""
+from contextlib import contextmanager
+
+import numpy as np
+
+from analytics.rolling import PrefixSums, _state
+
+# datetime.toordinal() of 1970-01-01, to turn days since the epoch into the
+# proleptic Gregorian day numbers the trend slope has always been measured in
+EPOCH_ORDINAL = 719163
+
+_DAY_NS = 24 * 60 * 60 * 10 ** 9
+
+
+def date_ordinals(dates):
+    """datetime.toordinal() of every date, without a per-row Python call"""
+    return np.asarray(dates, dtype='datetime64[D]').astype(np.int64) + EPOCH_ORDINAL
+
+
+def index_rows(dates, close, volume=None):
+    """(ordinal, close, volume) rows of a series, as SeriesIndex takes them"""
+    close = np.asarray(close, dtype=float)
+    volume = np.full(len(close), np.nan) if volume is None else np.asarray(volume, dtype=float)
+    return np.column_stack([date_ordinals(dates), close, volume])
+
+
+class SeriesIndex(PrefixSums):
+    """
+    Prefix regression sums of close on day number, and of volume, over rows of
+    (ordinal, close, volume). Bars with a missing close are left out of the
+    regression sums and bars with a missing volume out of the volume sums
+    """
+
+    n_terms = 8
+    # Rows of the prefix array
+    COUNT, X, Y, XX, XY, YY, VOLUME_COUNT, VOLUME = range(n_terms)
+
+    def __init__(self, dates, rows):
+        # Sums are taken around the first bar: shifted day numbers and their
+        # squares stay exact in float64 and large prices do not cancel
+        rows = self._as_rows(rows)
+        finite = rows[np.isfinite(rows[:, 1]), 1]
+        self.x_shift = rows[0, 0] if len(rows) else 0.0
+        self.y_shift = finite[0] if len(finite) else 0.0
+        super().__init__(dates, rows)
+
+    def _term_columns(self, n_columns):
+        return 1
+
+    def _terms(self, rows):
+        valid = np.isfinite(rows[:, 1:2])
+        x = np.where(valid, rows[:, :1] - self.x_shift, 0.0)
+        y = np.where(valid, rows[:, 1:2] - self.y_shift, 0.0)
+        has_volume = np.isfinite(rows[:, 2:3])
+        volume = np.where(has_volume, rows[:, 2:3], 0.0)
+        return np.stack([valid.astype(float), x, y, x * x, x * y, y * y, has_volume.astype(float), volume])
+
+    def bounds(self, first, last):
+        """(start, stop) of the bars dated from first to last, both days included"""
+        first = np.datetime64(first, 'D').astype('datetime64[ns]').astype(np.int64)
+        last = np.datetime64(last, 'D').astype('datetime64[ns]').astype(np.int64) + _DAY_NS
+        dates = self._dates[:self._n]
+        return int(np.searchsorted(dates, first)), int(np.searchsorted(dates, last))
+
+    def sums(self, start=0, stop=None):
+        """Every term summed over rows [start, stop)"""
+        stop = self._n if stop is None else stop
+        return self._prefix[:, stop, 0] - self._prefix[:, start, 0]
+
+    def volume_mean(self, start=0, stop=None):
+        sums = self.sums(start, stop)
+        return sums[self.VOLUME] / sums[self.VOLUME_COUNT] if sums[self.VOLUME_COUNT] else np.nan
+
+
+class IndexView:
+    """
+    A requested series within its cached index. Positions are relative to the
+    request, so they index the caller's frame directly
+    """
+
+    def __init__(self, index, start, stop):
+        self.index = index
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def _absolute(self, start, stop):
+        return self.start + start, self.start + (len(self) if stop is None else stop)
+
+    def bounds(self, first, last):
+        """(start, stop) of the request's bars dated from first to last"""
+        start, stop = self.index.bounds(first, last)
+        return (min(max(start, self.start), self.stop) - self.start,
+                min(max(stop, self.start), self.stop) - self.start)
+
+    def sums(self, start=0, stop=None):
+        return self.index.sums(*self._absolute(start, stop))
+
+    def window_sums(self, window, start=0, stop=None):
+        return self.index.window_sums(window, *self._absolute(start, stop))
+
+    def volume_mean(self, start=0, stop=None):
+        return self.index.volume_mean(*self._absolute(start, stop))
+
+
+@contextmanager
+def series_index(key, dates, close, volume=None):
+    """
+    IndexView of a series in the index cached under key (no caching when key
+    is None), built or extended as needed. The index is locked while the
+    view is in use, so reads do not interleave with an append
+    """
+    index, start, stop = _state(key, SeriesIndex, dates, index_rows(dates, close, volume))
+    try:
+        yield IndexView(index, start, stop)
+    finally:
+        index.lock.release()
@@ -0,0 +1,171 @@
+"""
+Single-pass moment engine for price, return and volume statistics.
+
+A Moments aggregate holds count, mean, central moment sums M2..M4, min and max.
+Aggregates of separate blocks (years, chunks of a long history, new bars
+appended to a stored series) merge exactly with the pairwise update formulas
+of Chan et al. / Pebay, so statistics never need a second pass over data that
+has already been summarised.
+"""
+import numpy as np
+
+from lazy_imports import lazy_import
+
+pd = lazy_import('pandas')
+stats = lazy_import('scipy.stats')
+
+
+class Moments:
+    """Mergeable count, mean, central moment sums, min and max of a sample"""
+
+    __slots__ = ('n', 'mean', 'm2', 'm3', 'm4', 'min', 'max')
+
+    def __init__(self, n=0, mean=0.0, m2=0.0, m3=0.0, m4=0.0, min=np.inf, max=-np.inf):
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+        self.m3 = m3
+        self.m4 = m4
+        self.min = min
+        self.max = max
+
+    @classmethod
+    def from_array(cls, values):
+        """Aggregate of an array, NaNs ignored"""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        n = len(values)
+        if n == 0:
+            return cls()
+
+        mean = values.mean()
+        d = values - mean
+        d2 = d * d
+        return cls(n, mean, d2.sum(), (d2 * d).sum(), (d2 * d2).sum(), values.min(), values.max())
+
+    def merge(self, other):
+        """Aggregate of the union of both samples"""
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            return other
+
+        n_a, n_b = self.n, other.n
+        n = n_a + n_b
+        delta = other.mean - self.mean
+        delta_n = delta / n
+
+        mean = self.mean + delta_n * n_b
+        m2 = self.m2 + other.m2 + delta * delta_n * n_a * n_b
+        m3 = (self.m3 + other.m3
+              + delta * delta_n ** 2 * n_a * n_b * (n_a - n_b)
+              + 3 * delta_n * (n_a * other.m2 - n_b * self.m2))
+        m4 = (self.m4 + other.m4
+              + delta * delta_n ** 3 * n_a * n_b * (n_a * n_a - n_a * n_b + n_b * n_b)
+              + 6 * delta_n ** 2 * (n_a * n_a * other.m2 + n_b * n_b * self.m2)
+              + 4 * delta_n * (n_a * other.m3 - n_b * self.m3))
+
+        return Moments(n, mean, m2, m3, m4, min(self.min, other.min), max(self.max, other.max))
+
+    __add__ = merge
+
+    def variance(self, ddof=1):
+        return self.m2 / (self.n - ddof) if self.n > ddof else np.nan
+
+    def std(self, ddof=1):
+        return np.sqrt(self.variance(ddof))
+
+    @property
+    def skew(self):
+        """Biased sample skewness, as scipy.stats.skew"""
+        if self.n < 2 or self.m2 == 0:
+            return np.nan
+        return np.sqrt(self.n) * self.m3 / self.m2 ** 1.5
+
+    @property
+    def kurtosis(self):
+        """Biased excess kurtosis, as scipy.stats.kurtosis"""
+        if self.n < 2 or self.m2 == 0:
+            return np.nan
+        return self.n * self.m4 / self.m2 ** 2 - 3.0
+
+    def jarque_bera(self):
+        """Jarque-Bera statistic and p-value from the moments, as scipy.stats.jarque_bera"""
+        statistic = self.n / 6.0 * (self.skew ** 2 + self.kurtosis ** 2 / 4.0)
+        return statistic, stats.chi2.sf(statistic, 2)
+
+
+def block_moments(values, starts):
+    """
+    Moments of contiguous blocks of an array (e.g. one block per year), computed
+    for all blocks at once with reduceat. The blocks merge back into the moments
+    of the whole array
+    """
+    values = np.asarray(values, dtype=float)
+    starts = np.asarray(starts, dtype=np.int64)
+    valid = ~np.isnan(values)
+    x = np.where(valid, values, 0.0)
+
+    counts = np.add.reduceat(valid.astype(np.int64), starts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.add.reduceat(x, starts) / counts
+    lengths = np.diff(np.append(starts, len(values)))
+    d = np.where(valid, x - np.repeat(np.nan_to_num(means), lengths), 0.0)
+    d2 = d * d
+
+    m2 = np.add.reduceat(d2, starts)
+    m3 = np.add.reduceat(d2 * d, starts)
+    m4 = np.add.reduceat(d2 * d2, starts)
+    mins = np.fmin.reduceat(np.where(valid, values, np.inf), starts)
+    maxs = np.fmax.reduceat(np.where(valid, values, -np.inf), starts)
+
+    return [Moments(int(n), mean, a, b, c, lo, hi) if n else Moments()
+            for n, mean, a, b, c, lo, hi in zip(counts, means, m2, m3, m4, mins, maxs)]
+
+
+def merge_all(moments):
+    """Merge a sequence of aggregates into one"""
+    total = Moments()
+    for m in moments:
+        total = total.merge(m)
+    return total
+
+
+def simple_returns(prices):
+    """
+    Simple returns of a price array without the leading NaN. Gaps are forward
+    filled first, as pandas pct_change does
+    """
+    prices = np.asarray(prices, dtype=float)
+    last_valid = np.maximum.accumulate(np.where(np.isnan(prices), 0, np.arange(len(prices))))
+    prices = prices[last_valid]
+    return prices[1:] / prices[:-1] - 1.0
+
+
+def calculate_statistics(data, periods_per_year=252):
+    """
+    Key price, return and volume statistics of an OHLCV frame, with returns
+    computed once and every moment taken from one aggregate per series
+    """
+    close = data['Close'].to_numpy(dtype=float)
+    volume = data['Volume'].to_numpy(dtype=float)
+
+    price = Moments.from_array(close)
+    returns = Moments.from_array(simple_returns(close))
+    volume_moments = Moments.from_array(volume)
+
+    d_stats = {
+        'Mean': price.mean if price.n else np.nan,
+        'Median': np.nanmedian(close) if price.n else np.nan,
+        'Std Dev': price.std(),
+        'Min': price.min if price.n else np.nan,
+        'Max': price.max if price.n else np.nan,
+        'Returns Mean': (returns.mean if returns.n else np.nan) * 100,
+        'Returns Std': returns.std() * 100,
+        'Volatility (Annual)': returns.std() * np.sqrt(periods_per_year) * 100,
+        'Volume Mean': volume_moments.mean if volume_moments.n else np.nan,
+        'Volume Median': np.nanmedian(volume) if volume_moments.n else np.nan,
+        'close_skew': price.skew,
+        'close_kurtosis': price.kurtosis
+    }
+    return pd.Series(d_stats)
@@ -1,76 +1,47 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-import yfinance as yf
 
+from analytics.correlation import (calculate_correlations, clustered, correlation_matrix, returns_matrix,
+                                   rolling_mean_correlation)
+from market_data import fetch_index_closes
+from price_store import get_store
+from universe import all_tickers, BENCHMARK_INDICES, DEFAULT_BENCHMARKS, industries
 
-def get_market_data(start_date, end_date):
+
+def get_market_data(start_date, end_date, benchmarks=DEFAULT_BENCHMARKS):
     """
-    Fetch market data using pandas and ensure proper column naming
+    Fetch benchmark index closes concurrently through the shared index cache
     """
-    indices = {
-        'ASX200': '^AXJO',
-        'ALL-ORD': '^AORD',
-        'ASX300': '^AXKO'
-    }
+    indices = {name: BENCHMARK_INDICES[name] for name in benchmarks}
+
+    closes, errors = fetch_index_closes(list(indices.values()), start_date, end_date)
 
     market_data = {}
     for name, symbol in indices.items():
-        try:
-            # Download data
-            df = yf.download(symbol, start=start_date, end=end_date)
-
-            # Extract and rename Close column
-            if isinstance(df.columns, pd.MultiIndex):
-                close_data = df['Close', symbol]
-            else:
-                close_data = df['Close']
-
-            market_data[name] = pd.Series(
-                close_data.values,
-                index=df.index,
-                name='Close'
-            )
-
-        except Exception as e:
-            st.warning(f"Could not fetch data for {name}: {str(e)}")
+        if symbol in closes:
+            market_data[name] = closes[symbol].rename('Close')
+        else:
+            st.warning(f"Could not fetch data for {name}: {errors[symbol]}")
 
     return market_data
 
 
-def calculate_correlations(stock_data, market_data, window):
+def get_group_returns(tickers, start_date, end_date):
     """
-    Calculate correlations using pandas
+    Aligned daily returns of several tickers read from the price store
     """
-    # Convert stock data to pandas series
-    stock_prices = pd.Series(stock_data['Close'].values, index=pd.to_datetime(stock_data['Date']))
-
-    # Calculate stock returns
-    stock_returns = stock_prices.pct_change().dropna()
-
-    correlations = {}
-    rolling_correlations = {}
-
-    for market_name, market_prices in market_data.items():
+    store = get_store()
+    closes = {}
+    for ticker in tickers:
         try:
-            # Calculate market returns
-            market_returns = market_prices.pct_change().dropna()
-
-            # Align the series
-            stock_aligned, market_aligned = stock_returns.align(market_returns)
-
-            # Calculate static correlation
-            static_corr = stock_aligned.corr(market_aligned)
-            correlations[market_name] = static_corr
-
-            # Calculate rolling correlation
-            roll_corr = stock_aligned.rolling(window=window).corr(market_aligned)
-            rolling_correlations[market_name] = roll_corr
-
+            df = store.load(ticker, start_date, end_date)
+            if not df.empty:
+                closes[ticker] = df['Close']
         except Exception as e:
-            st.warning(f"Error calculating correlation for {market_name}: {str(e)}")
+            st.warning(f"Could not load prices for {ticker}: {str(e)}")
 
-    return correlations, rolling_correlations
+    return returns_matrix(closes)
 
 
 def visualize_correlations(correlations, rolling_correlations):
@@ -116,6 +87,47 @@ def visualize_correlations(correlations, rolling_correlations):
     st.plotly_chart(fig_rolling, use_container_width=True)
 
 
+def visualize_correlation_matrix(corr, mean_correlation, title):
+    """
+    Create a clustered heatmap of the cross-sectional correlation matrix and the
+    rolling average correlation of the group
+    """
+    ordered = clustered(corr)
+    labels = [ticker.replace('.AX', '') for ticker in ordered.index]
+
+    fig_matrix = go.Figure(data=go.Heatmap(
+        z=ordered.values,
+        x=labels,
+        y=labels,
+        colorscale='RdBu',
+        zmin=-1, zmax=1,
+        hovertemplate="%{y} / %{x}: %{z:.3f}<extra></extra>"
+    ))
+
+    fig_matrix.update_layout(
+        title=title,
+        height=max(400, 22 * len(labels)),
+        yaxis=dict(autorange='reversed')
+    )
+    st.plotly_chart(fig_matrix, use_container_width=True)
+
+    fig_mean = go.Figure(go.Scatter(
+        x=mean_correlation.index,
+        y=mean_correlation.values,
+        name='Mean Correlation',
+        mode='lines'
+    ))
+
+    fig_mean.update_layout(
+        title="Rolling Average Pairwise Correlation",
+        xaxis_title="Date",
+        yaxis_title="Correlation",
+        yaxis=dict(range=[-1, 1]),
+        height=400
+    )
+    st.plotly_chart(fig_mean, use_container_width=True)
+
+
 def analyze_correlations():
     """
     Main function to analyze correlations
@@ -136,23 +148,47 @@ def analyze_correlations():
 
         # Parameters
         window = st.sidebar.slider("Rolling Window (days)", 5, 252, 20)
+        benchmarks = st.sidebar.multiselect(
+            "Benchmark Indices",
+            list(BENCHMARK_INDICES.keys()),
+            default=DEFAULT_BENCHMARKS
+        )
+        scope = st.sidebar.selectbox("Correlation Matrix Scope", ["Industry", "Whole Universe"])
 
         # Get market data
         with st.spinner('Fetching market data...'):
             market_data = get_market_data(
                 stock_data['Date'].min(),
-                stock_data['Date'].max()
+                stock_data['Date'].max(),
+                benchmarks
             )
 
         if market_data:
             # Calculate correlations
             correlations, rolling_correlations = calculate_correlations(
-                stock_data, market_data, window
+                stock_data, market_data, window, st.session_state['ticker']
             )
 
             # Visualize results
             st.markdown(f"### Correlation Analysis for {st.session_state['ticker']}")
             visualize_correlations(correlations, rolling_correlations)
+
+        # Cross-sectional correlation across the industry group or the whole universe
+        industry = next((name for name, tickers in industries.items()
+                         if st.session_state['ticker'] in tickers), None)
+        if scope == "Industry" and industry:
+            group, scope_name = industries[industry], industry
+        else:
+            group, scope_name = all_tickers(), "Whole Universe"
+
+        with st.spinner('Calculating correlation matrix...'):
+            group_returns = get_group_returns(group, stock_data['Date'].min(), stock_data['Date'].max())
+
+        if group_returns.shape[1] > 1:
+            corr = correlation_matrix(group_returns)
+            mean_correlation = rolling_mean_correlation(group_returns, window, step=max(1, window // 4))
+            st.markdown(f"### Correlation Matrix - {scope_name}")
+            visualize_correlation_matrix(corr, mean_correlation, "Clustered Correlation Matrix")
     else:
         st.warning('⚠️ No data available. Please select a ticker first!')
 
@@ -3,9 +3,11 @@ import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from statsmodels.tsa.seasonal import seasonal_decompose
-from statsmodels.tsa.stattools import acf, pacf
-from scipy import stats
+
+from analytics.decomposition import decompose, METHODS, MSTL_PERIODS, PERIOD_RANGE, precompute_periods
+from analytics.seasonality import (autocorrelations, calculate_monthly_patterns, calendar_effects, ljung_box,
+                                   MONTH_NAMES)
+from downsample import downsample_line
 
 
 def clean_stock_data(df):
@@ -15,40 +17,6 @@ def clean_stock_data(df):
     return df
 
 
-def calculate_monthly_patterns(stock_data):
-    """Calculate monthly statistics and patterns"""
-    # Add month information
-    monthly_data = stock_data.copy()
-    monthly_data['Month'] = monthly_data.index.month
-    month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
-                   'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-
-    # Calculate statistics
-    monthly_stats = monthly_data.groupby('Month')['Close'].agg([
-        'mean', 'std', 'min', 'max', 'count'
-    ]).round(2)
-
-    # Calculate returns
-    monthly_data['Return'] = monthly_data['Close'].pct_change()
-    monthly_returns = monthly_data.groupby('Month')['Return'].mean() * 100
-
-    # Calculate statistical significance
-    stats_data = []
-    for month in range(1, 13):
-        month_returns = monthly_data[monthly_data['Month'] == month]['Return']
-        t_stat, p_value = stats.ttest_1samp(month_returns.dropna(), 0)
-        stats_data.append({
-            'Month': month_names[month - 1],
-            'Average_Return': monthly_returns[month],
-            'T_Statistic': t_stat,
-            'P_Value': p_value,
-            'Sample_Size': len(month_returns.dropna())
-        })
-
-    seasonal_stats = pd.DataFrame(stats_data)
-    return monthly_stats, monthly_returns, seasonal_stats
-
-
 def plot_monthly_patterns(monthly_stats, monthly_returns, seasonal_stats):
     """Create comprehensive monthly pattern plots"""
     fig = make_subplots(
@@ -63,8 +31,7 @@ def plot_monthly_patterns(monthly_stats, monthly_returns, seasonal_stats):
         horizontal_spacing=0.1
     )
 
-    months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
-              'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+    months = MONTH_NAMES
 
     # Monthly prices
     fig.add_trace(
@@ -129,13 +96,35 @@ def plot_monthly_patterns(monthly_stats, monthly_returns, seasonal_stats):
     return fig
 
 
-def perform_seasonal_decomposition(data, period, model='additive'):
+def plot_calendar_effects(effects):
+    """Average daily return of each calendar group, significant groups highlighted"""
+    fig = make_subplots(rows=1, cols=len(effects), subplot_titles=list(effects), horizontal_spacing=0.08)
+
+    for col, effect in enumerate(effects.values(), start=1):
+        fig.add_trace(
+            go.Bar(
+                x=effect.index,
+                y=effect['Average_Return'],
+                error_y=dict(type='data', array=effect['Std_Return'] / np.sqrt(effect['Sample_Size'])),
+                marker_color=['red' if p < 0.05 else 'gray' for p in effect['P_Value']],
+                name='Average Return'
+            ),
+            row=1, col=col
+        )
+
+    fig.update_layout(height=400, showlegend=False, title_text="Calendar Effects (significant at 5% in red)")
+    fig.update_yaxes(title_text="Avg Daily Return (%)", row=1, col=1)
+    return fig
+
+
+def perform_seasonal_decomposition(data, period, model='additive', full_resolution=False, method='classical',
+                                   series_key=None):
     """Perform seasonal decomposition"""
-    decomposition = seasonal_decompose(
-        data,
-        period=period,
-        model=model
-    )
+    components = decompose(series_key, data, period, model, method)
+
+    # Reduce each component to the chart's point budget unless full resolution is asked for
+    lines = {name: downsample_line(data.index, values, not full_resolution)
+             for name, values in components.items()}
 
     fig = make_subplots(
         rows=4, cols=1,
@@ -144,39 +133,19 @@ def perform_seasonal_decomposition(data, period, model='additive'):
         row_width=[0.25, 0.25, 0.25, 0.25]
     )
 
-    # Original data
-    fig.add_trace(
-        go.Scatter(x=data.index, y=data, mode='lines', name='Original'),
-        row=1, col=1
-    )
-
-    # Trend
-    fig.add_trace(
-        go.Scatter(x=data.index, y=decomposition.trend, mode='lines', name='Trend'),
-        row=2, col=1
-    )
-
-    # Seasonal
-    fig.add_trace(
-        go.Scatter(x=data.index, y=decomposition.seasonal, mode='lines', name='Seasonal'),
-        row=3, col=1
-    )
-
-    # Residual
-    fig.add_trace(
-        go.Scatter(x=data.index, y=decomposition.resid, mode='lines', name='Residual'),
-        row=4, col=1
-    )
+    for row, (name, (x, y)) in enumerate(lines.items(), start=1):
+        fig.add_trace(
+            go.Scatter(x=x, y=y, mode='lines', name=name),
+            row=row, col=1
+        )
 
     fig.update_layout(height=900, showlegend=True)
     return fig
 
 
-def plot_acf_pacf(data, lags):
+def plot_acf_pacf(data, lags, series_key=None):
     """Create ACF and PACF plots"""
-    acf_values = acf(data, nlags=lags)
-    pacf_values = pacf(data, nlags=lags)
-    conf_int = 1.96 / np.sqrt(len(data))
+    acf_values, pacf_values, conf_int = autocorrelations(data, lags, series_key)
 
     fig = make_subplots(
         rows=2, cols=1,
@@ -187,7 +156,7 @@ def plot_acf_pacf(data, lags):
 
     # ACF plot
     fig.add_trace(
-        go.Bar(x=np.arange(lags + 1), y=acf_values, name='ACF'),
+        go.Bar(x=np.arange(len(acf_values)), y=acf_values, name='ACF'),
         row=1, col=1
     )
     fig.add_hline(y=conf_int, line_dash="dash", line_color="red", row=1, col=1)
@@ -195,7 +164,7 @@ def plot_acf_pacf(data, lags):
 
     # PACF plot
     fig.add_trace(
-        go.Bar(x=np.arange(lags + 1), y=pacf_values, name='PACF'),
+        go.Bar(x=np.arange(len(pacf_values)), y=pacf_values, name='PACF'),
         row=2, col=1
     )
     fig.add_hline(y=conf_int, line_dash="dash", line_color="red", row=2, col=1)
@@ -219,12 +188,21 @@ def analyze_seasonality():
 
             # Parameters
             st.sidebar.header("Analysis Parameters")
-            period = st.sidebar.slider("Seasonality Period", 2, 52, 12)
+            period = st.sidebar.slider("Seasonality Period", *PERIOD_RANGE, 12)
             decomp_model = st.sidebar.selectbox(
                 "Decomposition Model",
                 ['additive', 'multiplicative']
             )
+            decomp_method = st.sidebar.selectbox(
+                "Decomposition Method",
+                METHODS,
+                help="Classical moving averages, or robust LOESS (STL) for one period or several (MSTL)"
+            )
+            if decomp_method == 'MSTL':
+                mstl_periods = st.sidebar.multiselect("MSTL Periods", [5, 21, 63, 252], default=list(MSTL_PERIODS))
             lags = st.sidebar.slider("Number of Lags", 1, 100, 40)
+            full_resolution = st.sidebar.checkbox("Full resolution charts", value=False,
+                                                  help="Send every bar to the browser instead of a downsampled series")
 
             # Monthly patterns analysis
             st.header("Monthly Patterns")
@@ -242,24 +220,52 @@ def analyze_seasonality():
                     .sort_values('P_Value')
                 )
 
+            # Day-of-week, turn-of-month and quarter effects
+            st.header("Calendar Effects")
+            effects = calendar_effects(stock_data)
+            st.plotly_chart(plot_calendar_effects(effects), use_container_width=True)
+            st.dataframe(
+                pd.concat(effects, names=['Effect', 'Group'])
+                [['Average_Return', 'T_Statistic', 'P_Value', 'Sample_Size']]
+                .round(3)
+            )
+
             # Seasonal decomposition
             st.header("Seasonal Decomposition")
-            if len(stock_data) >= period * 2:
+            # Decompositions are cached per series and extended when new bars
+            # arrive; the common periods are decomposed in the background
+            decomp_key = (st.session_state['ticker'], 'Close')
+            decomp_period = tuple(mstl_periods) if decomp_method == 'MSTL' else period
+            min_length = 2 * max(np.atleast_1d(decomp_period), default=0)
+            if decomp_method == 'MSTL' and not mstl_periods:
+                st.warning("Select at least one period for MSTL")
+            elif len(stock_data) >= min_length:
                 fig_decomp = perform_seasonal_decomposition(
                     stock_data['Close'],
-                    period=period,
-                    model=decomp_model
+                    period=decomp_period,
+                    model=decomp_model,
+                    full_resolution=full_resolution,
+                    method=decomp_method,
+                    series_key=decomp_key
                 )
                 st.plotly_chart(fig_decomp, use_container_width=True)
+                precompute_periods(decomp_key, stock_data['Close'], decomp_model, decomp_method)
             else:
-                st.warning(f"Need at least {period * 2} observations for decomposition")
+                st.warning(f"Need at least {min_length} observations for decomposition")
 
             # Autocorrelation analysis
             st.header("Autocorrelation Analysis")
             if len(stock_data) > lags:
                 returns = stock_data['Close'].pct_change().dropna()
-                fig_corr = plot_acf_pacf(returns, lags)
+                # Profiles are cached per series version, so moving the lag
+                # slider only slices the cached ACF and PACF
+                series_key = (st.session_state['ticker'], stock_data.index[0], stock_data.index[-1],
+                              len(stock_data), float(stock_data['Close'].iloc[-1]))
+                fig_corr = plot_acf_pacf(returns, lags, series_key)
                 st.plotly_chart(fig_corr, use_container_width=True)
+
+                st.subheader("Ljung-Box Test")
+                st.dataframe(ljung_box(returns, sorted({5, 10, 20, lags}), series_key).round(4))
             else:
                 st.warning("Need more observations for correlation analysis")
 
@@ -271,4 +277,5 @@ def analyze_seasonality():
         st.warning('⚠️ No data available. Please select a ticker first!')
 
 
-analyze_seasonality()
\ No newline at end of file
+if __name__ == "__main__":
+    analyze_seasonality()
@@ -0,0 +1,239 @@
+"""
+Parsed article uploads for the verification form, cached by content hash.
+
+An upload is parsed once per distinct file, not on every Streamlit rerun.
+Small files are decoded in one json.loads. Large exports are streamed in a
+background thread: with ijson when it is installed, otherwise with an
+incremental json raw_decode over the decoded text that only buffers the
+article being read. Articles become visible to the page as they are parsed,
+so the first page renders before the whole file has been read. Each
+article's SentenceIndex is built as it is loaded, on the sentence index
+worker pool for streamed uploads.
+"""
+import codecs
+import hashlib
+import io
+import json
+import threading
+
+from sentence_index import INDEX_BATCH, SentenceIndex, build_indexes, submit_batches
+from ttl_cache import get_cache
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+REQUIRED_FIELDS = ('uri', 'title', 'body', 'source')
+
+# Uploads above this size are parsed in the background, streaming
+STREAM_THRESHOLD = 2 * 1024 * 1024
+
+# Text decoded per read by the fallback streaming parser
+CHUNK_SIZE = 256 * 1024
+
+# Parsed uploads are kept for a working day
+ARTICLE_STORE_TTL = 8 * 60 * 60
+
+_decoder = json.JSONDecoder()
+
+
+class ArticleFormatError(ValueError):
+    """The upload is not a JSON list of articles with the required fields"""
+
+
+def _check_article(article, position):
+    if not isinstance(article, dict):
+        raise ArticleFormatError("Invalid JSON format. Expected a list of articles.")
+    missing = [field for field in REQUIRED_FIELDS if field not in article]
+    if missing:
+        raise ArticleFormatError(
+            f"Article {article.get('uri', position + 1)} is missing required fields: {missing}")
+
+
+def _iter_chunks(data, chunk_size=CHUNK_SIZE):
+    """UTF-8 text of data in chunks, without decoding it all at once"""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    view = memoryview(data)
+    for start in range(0, len(view), chunk_size):
+        yield decoder.decode(view[start:start + chunk_size], final=start + chunk_size >= len(view))
+
+
+def iter_json_array(data, chunk_size=CHUNK_SIZE):
+    """
+    Items of a top-level JSON array in bytes, decoded one at a time with
+    raw_decode. Only the unparsed tail of the current chunk is buffered
+    """
+    chunks = _iter_chunks(data, chunk_size)
+    buffer, position = '', 0
+    state = 'start'
+
+    def more():
+        nonlocal buffer, position
+        chunk = next(chunks, None)
+        if chunk is None:
+            return False
+        buffer = buffer[position:] + chunk
+        position = 0
+        return True
+
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n':
+            position += 1
+        if position >= len(buffer):
+            if more():
+                continue
+            raise json.JSONDecodeError("Unexpected end of file", buffer, position)
+
+        char = buffer[position]
+        if state == 'start':
+            if char != '[':
+                raise ArticleFormatError("Invalid JSON format. Expected a list of articles.")
+            position += 1
+            state = 'first'
+        elif char == ']':
+            if state == 'item':
+                raise json.JSONDecodeError("Trailing comma in array", buffer, position)
+            # Only whitespace may follow the array, as json.loads requires
+            position += 1
+            while True:
+                extra = buffer[position:].lstrip(' \t\r\n')
+                if extra:
+                    raise json.JSONDecodeError("Extra data", buffer, len(buffer) - len(extra))
+                if not more():
+                    return
+        elif state == 'separator':
+            if char != ',':
+                raise json.JSONDecodeError("Expecting ',' delimiter", buffer, position)
+            position += 1
+            state = 'item'
+        else:
+            try:
+                item, end = _decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The item runs past the buffered text: read on, or fail at the end
+                if more():
+                    continue
+                raise
+            if not isinstance(item, (dict, list, str)) and (end == len(buffer) or buffer[end] not in ' \t\r\n,]'):
+                # A number cut at the end of the chunk, e.g. '4.' of '4.5e10'
+                if more():
+                    continue
+            position = end
+            state = 'separator'
+            yield item
+
+
+def _iter_articles(data):
+    if ijson is not None:
+        return ijson.items(io.BytesIO(data), 'item', use_float=True)
+    return iter_json_array(data)
+
+
+class ArticleStore:
+    """
+    Articles of one upload, in file order. Parsing runs in a background
+    thread for large files; readers wait only for the articles they need
+    """
+
+    def __init__(self, data, name=None):
+        self.name = name
+        self.size = len(data)
+        self.articles = []
+        self.error = None
+        self._indexes = {}
+        self._done = threading.Event()
+        self._progress = threading.Condition()
+
+        if self.size <= STREAM_THRESHOLD:
+            self._parse_all(data)
+        else:
+            threading.Thread(target=self._stream, args=(data,), name='article-store', daemon=True).start()
+
+    def __len__(self):
+        return len(self.articles)
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def _finish(self, error=None):
+        with self._progress:
+            self.error = error
+            self._done.set()
+            self._progress.notify_all()
+
+    def _parse_all(self, data):
+        try:
+            articles = json.loads(data.decode('utf-8-sig'))
+            if not isinstance(articles, list):
+                raise ArticleFormatError("Invalid JSON format. Expected a list of articles.")
+            for position, article in enumerate(articles):
+                _check_article(article, position)
+            self.articles = articles
+            self._indexes = dict(enumerate(build_indexes(articles)))
+            self._finish()
+        except ValueError as e:
+            self._finish(e)
+
+    def _add_indexes(self, start, indexes):
+        self._indexes.update(zip(range(start, start + len(indexes)), indexes))
+
+    def _stream(self, data):
+        indexed = 0
+        try:
+            for position, article in enumerate(_iter_articles(data)):
+                _check_article(article, position)
+                with self._progress:
+                    self.articles.append(article)
+                    self._progress.notify_all()
+                if position + 1 - indexed == INDEX_BATCH:
+                    submit_batches(self.articles, indexed, position + 1, self._add_indexes)
+                    indexed = position + 1
+            submit_batches(self.articles, indexed, len(self.articles), self._add_indexes)
+            self._finish()
+        except Exception as e:
+            self._finish(e)
+
+    def wait(self, count=None, timeout=None):
+        """
+        Block until `count` articles are parsed (all of them when None), the
+        file is exhausted, or timeout seconds pass. Returns the parsed count
+        """
+        with self._progress:
+            self._progress.wait_for(lambda: self.done or (count is not None and len(self.articles) >= count),
+                                    timeout)
+            return len(self.articles)
+
+    def sentence_index(self, position):
+        """SentenceIndex of the article at position, built now if its batch has not run yet"""
+        index = self._indexes.get(position)
+        if index is None:
+            index = self._indexes.setdefault(position, SentenceIndex(self.articles[position]))
+        return index
+
+    def all(self):
+        """Every article, once parsing has finished"""
+        self._done.wait()
+        return self.articles
+
+
+def upload_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def get_article_store(uploaded_file):
+    """
+    ArticleStore of an uploaded file (Streamlit UploadedFile, bytes or a file
+    path), shared by every rerun and session that uploads the same content
+    """
+    if isinstance(uploaded_file, str):
+        with open(uploaded_file, 'rb') as f:
+            data, name = f.read(), uploaded_file
+    elif isinstance(uploaded_file, (bytes, bytearray)):
+        data, name = bytes(uploaded_file), None
+    else:
+        data, name = uploaded_file.getvalue(), uploaded_file.name
+
+    stores = get_cache('article_store', ttl=ARTICLE_STORE_TTL, maxsize=8)
+    return stores.get_or_compute(upload_hash(data), lambda: ArticleStore(data, name))
@@ -1,16 +1,8 @@
 import streamlit as st
 import pandas as pd
 
-import yfinance as yf
-
-# Define Industries and stocks
-industries = {
-    'Banks': ['ANZ.AX', 'CBA.AX', 'NAB.AX', 'WBC.AX', 'BOQ.AX', 'BEN.AX'],
-    'Financial Services': ['MQG.AX', 'SQ2.AX', 'ASX.AX', 'SOL.AX', 'CCP.AX', 'EQT.AX'],
-    'Insurance': ['QBE.AX', 'SUN.AX', 'IAG.AX', 'MPL.AX', 'SDF.AX', 'AUB.AX'],
-    'Software & Services': ['WTC.AX', 'XRO.AX', 'NXT.AX', 'TNE.AX', '360.AX', 'MAQ.AX'],
-    'Media & Entertainment': ['REA.AX', 'NWS.AX', 'CAR.AX', 'SEK.AX', 'NEC.AX']
-}
+from market_data import get_provider
+from universe import industries
 
 
 def fetch_company_info(ticker):
@@ -24,8 +16,7 @@ def fetch_company_info(ticker):
         DataFrame with company details
     """
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
+        info = get_provider().company_info(ticker)
 
         data = {
             'Name': info.get('longName', 'N/A'),
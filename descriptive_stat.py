@@ -1,100 +1,15 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
-import numpy as np
-
-from plotly.subplots import make_subplots
-from scipy import stats
-
-
-def calculate_statistics(data):
-    """Calculate key statistics for the dataset"""
-    d_stats = {
-        'Mean': data['Close'].mean(),
-        'Median': data['Close'].median(),
-        'Std Dev': data['Close'].std(),
-        'Min': data['Close'].min(),
-        'Max': data['Close'].max(),
-        'Returns Mean': data['Close'].pct_change().mean() * 100,
-        'Returns Std': data['Close'].pct_change().std() * 100,
-        'Volatility (Annual)': data['Close'].pct_change().std() * np.sqrt(252) * 100,
-        'Volume Mean': data['Volume'].mean(),
-        'Volume Median': data['Volume'].median(),
-        'close_skew': stats.skew(data['Close']),
-        'close_kurtosis': stats.kurtosis(data['Close'])
-    }
-    return pd.Series(d_stats)
-
-
-def create_ohlcv_chart(df, title):
-    """Create OHLCV chart with moving averages"""
-    # Calculate moving averages
-    df['MA5'] = df['Close'].rolling(window=5).mean()
-    df['MA20'] = df['Close'].rolling(window=20).mean()
-
-    # Create a plotly figure with two subplots stacked vertically
-    fig = make_subplots(rows=2, cols=1,
-                        row_heights=[0.6, 0.4],
-                        vertical_spacing=0.2,
-                        subplot_titles=(title, 'Volume'))
-
-    # Candlestick chart
-    fig.add_trace(
-        go.Candlestick(
-            x=df.index,
-            open=df['Open'],
-            high=df['High'],
-            low=df['Low'],
-            close=df['Close'],
-            name='OHLC'
-        ),
-        row=1, col=1
-    )
-
-    # Add moving averages
-    fig.add_trace(
-        go.Scatter(
-            x=df.index,
-            y=df['MA5'],
-            name='5-day MA',
-            line=dict(color='orange', width=1),
-            hovertemplate="Date: %{x}<br>Close: $%{y:.2f}<extra></extra>"
-        ),
-        row=1, col=1
-    )
-
-    fig.add_trace(
-        go.Scatter(
-            x=df.index,
-            y=df['MA20'],
-            name='20-day MA',
-            line=dict(color='blue', width=1),
-            hovertemplate="Date: %{x}<br>Close: $%{y:.2f}<extra></extra>"
-        ),
-        row=1, col=1
-    )
-
-    # Volume chart
-    colors = ['red' if row['Open'] > row['Close'] else 'green' for idx, row in df.iterrows()]
-    fig.add_trace(
-        go.Bar(
-            x=df.index,
-            y=df['Volume'],
-            name='Volume',
-            marker_color=colors,
-            hovertemplate="Date: %{x}<br>Volume: %{y}"
-        ),
-        row=2, col=1
-    )
-
-    fig.update_layout(
-        height=800,
-        showlegend=True,
-        xaxis_rangeslider_visible=False,
-        template='plotly_white'
-    )
-
-    return fig
+
+from analytics.periods import PERIODS_PER_YEAR, resample_ohlcv
+from analytics.stats import calculate_statistics
+from ohlcv_chart import build_ohlcv_figure, get_ohlcv_traces, prepare_ohlcv_traces
+
+
+def create_ohlcv_chart(df, title, ticker=None, frequency='daily', full_resolution=False):
+    """Create OHLCV chart with moving averages from cached, vectorized traces"""
+    traces = get_ohlcv_traces(df, ticker, frequency) if ticker else prepare_ohlcv_traces(df)
+    return build_ohlcv_figure(traces, title, full_resolution)
 
 
 st.title("Descriptive Statistics Analysis")
@@ -102,19 +17,18 @@ st.title("Descriptive Statistics Analysis")
 if 'stock_data' in st.session_state:
     # Get the data
     df = st.session_state['stock_data'].copy()
+    ticker = st.session_state.get('ticker')
+    full_resolution = st.sidebar.checkbox("Full resolution charts", value=False,
+                                          help="Send every bar to the browser instead of a downsampled series")
 
     # Convert Date column to datetime and set as index
     df['Date'] = pd.to_datetime(df['Date'])
     df.set_index('Date', inplace=True)
 
-    # Create weekly data
-    weekly_df = df.resample('W').agg({
-        'Open': 'first',
-        'High': 'max',
-        'Low': 'min',
-        'Close': 'last',
-        'Volume': 'sum'
-    })
+    # Create weekly data from the series' cached trading-calendar period index
+    series_key = (ticker, df.index[0], df.index[-1], len(df), float(df['Close'].iloc[-1])) \
+        if ticker and len(df) else None
+    weekly_df = resample_ohlcv(df, 'weekly', series_key)
 
     # Tabs for different timeframes
     tab1, tab2 = st.tabs(["Daily Analysis", "Weekly Analysis"])
@@ -123,7 +37,8 @@ if 'stock_data' in st.session_state:
         st.header("Daily Price Analysis")
 
         # Display daily chart
-        daily_fig = create_ohlcv_chart(df, "Daily OHLC with Moving Averages")
+        daily_fig = create_ohlcv_chart(df, "Daily OHLC with Moving Averages", ticker, 'daily',
+                                   full_resolution)
         st.plotly_chart(daily_fig, use_container_width=True)
 
         # Daily statistics
@@ -146,14 +61,17 @@ if 'stock_data' in st.session_state:
 
     with tab2:
         st.header("Weekly Price Analysis")
+        if len(weekly_df) and not weekly_df['Complete'].iloc[-1]:
+            st.caption(f"The latest week is still in progress ({weekly_df['Sessions'].iloc[-1]} sessions so far).")
 
         # Display weekly chart
-        weekly_fig = create_ohlcv_chart(weekly_df, "Weekly OHLC with Moving Averages")
+        weekly_fig = create_ohlcv_chart(weekly_df, "Weekly OHLC with Moving Averages", ticker, 'weekly',
+                                    full_resolution)
         st.plotly_chart(weekly_fig, use_container_width=True)
 
         # Weekly statistics
         st.subheader("Weekly Statistics")
-        weekly_stats = calculate_statistics(weekly_df)
+        weekly_stats = calculate_statistics(weekly_df, PERIODS_PER_YEAR['weekly'])
 
         col1, col2, col3 = st.columns(3)
         with col1:
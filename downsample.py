@@ -0,0 +1,126 @@
+"""
+Server-side downsampling for Plotly charts.
+
+A browser chart cannot show more points than it has pixels, so sending every
+bar of a multi-decade series only inflates the websocket payload and the
+render time. Lines are reduced with Largest-Triangle-Three-Buckets (LTTB),
+which keeps the visual shape, and candles with OHLC bucket aggregation, which
+keeps every bucket's open, high, low, close and total volume exact.
+"""
+import numpy as np
+
+# Streamlit does not report the rendered chart width to the server, so the
+# budget is derived from a typical wide-layout chart width
+DEFAULT_CHART_WIDTH = 1200
+
+# Points per horizontal pixel for line traces and pixels per candle
+LINE_POINTS_PER_PIXEL = 2
+CANDLE_PIXELS = 3
+
+
+def line_budget(width=DEFAULT_CHART_WIDTH):
+    """Maximum useful number of points for a line trace of the given width"""
+    return int(width * LINE_POINTS_PER_PIXEL)
+
+
+def candle_budget(width=DEFAULT_CHART_WIDTH):
+    """Maximum useful number of candles or bars for a chart of the given width"""
+    return max(1, int(width // CANDLE_PIXELS))
+
+
+def _numeric(x):
+    """x values as float64, with datetimes converted to nanoseconds"""
+    x = np.asarray(x)
+    if x.dtype == object:
+        x = np.asarray(x, dtype='datetime64[ns]')
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(float)
+    return x.astype(float)
+
+
+def bucket_starts(n, n_buckets):
+    """Start offsets of n_buckets contiguous, near-equal buckets over n rows"""
+    n_buckets = max(1, min(n, n_buckets))
+    return np.linspace(0, n, n_buckets + 1).astype(np.int64)[:-1]
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Indices of the points kept by Largest-Triangle-Three-Buckets.
+
+    NaN points are skipped (so leading NaNs of a moving average cost nothing)
+    and the first and last valid points are always kept.
+    """
+    y = np.asarray(y, dtype=float)
+    valid = np.flatnonzero(~np.isnan(y))
+    if len(valid) <= n_out or n_out < 3:
+        return valid
+
+    xs, ys = _numeric(x)[valid], y[valid]
+    n = len(valid)
+
+    # Interior points are split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+
+    # Mean of each following bucket, computed for all buckets at once
+    cum_x = np.concatenate(([0.0], np.cumsum(xs)))
+    cum_y = np.concatenate(([0.0], np.cumsum(ys)))
+    next_lo, next_hi = edges[1:], np.append(edges[2:], n)
+    counts = np.maximum(next_hi - next_lo, 1)
+    mean_x = (cum_x[next_hi] - cum_x[next_lo]) / counts
+    mean_y = (cum_y[next_hi] - cum_y[next_lo]) / counts
+
+    previous = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        ax, ay = xs[previous], ys[previous]
+        areas = np.abs((ax - mean_x[b]) * (ys[lo:hi] - ay) - (ax - xs[lo:hi]) * (mean_y[b] - ay))
+        previous = lo + int(np.argmax(areas))
+        keep[b + 1] = previous
+
+    return valid[keep]
+
+
+def lttb(x, y, n_out):
+    """Downsample a line to at most n_out points with LTTB, returns (x, y)"""
+    idx = lttb_indices(x, y, n_out)
+    return np.asarray(x)[idx], np.asarray(y)[idx]
+
+
+def ohlc_downsample(x, open_, high, low, close, volume=None, n_buckets=None):
+    """
+    Aggregate bars into at most n_buckets contiguous buckets: first open, max
+    high, min low, last close and summed volume, stamped with the bucket's
+    first x. Returns a dict with the same keys as the inputs
+    """
+    n = len(open_)
+    n_buckets = candle_budget() if n_buckets is None else n_buckets
+    x = np.asarray(x)
+    arrays = {'x': x, 'open': open_, 'high': high, 'low': low, 'close': close}
+    if volume is not None:
+        arrays['volume'] = volume
+    if n <= n_buckets:
+        return {key: np.asarray(values) for key, values in arrays.items()}
+
+    starts = bucket_starts(n, n_buckets)
+    ends = np.append(starts[1:], n) - 1
+
+    result = {
+        'x': x[starts],
+        'open': np.asarray(open_, dtype=float)[starts],
+        'high': np.fmax.reduceat(np.asarray(high, dtype=float), starts),
+        'low': np.fmin.reduceat(np.asarray(low, dtype=float), starts),
+        'close': np.asarray(close, dtype=float)[ends],
+    }
+    if volume is not None:
+        result['volume'] = np.add.reduceat(np.nan_to_num(np.asarray(volume, dtype=float)), starts)
+    return result
+
+
+def downsample_line(x, y, enabled=True, width=DEFAULT_CHART_WIDTH):
+    """(x, y) for a line trace, reduced to the chart's point budget when enabled"""
+    if not enabled:
+        return x, y
+    return lttb(x, y, line_budget(width))
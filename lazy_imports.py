@@ -0,0 +1,166 @@
+"""
+Deferred imports and an in-process import-time profile.
+
+lazy_import() returns a placeholder that imports the real module on first
+attribute access, so a heavy library (statsmodels, SciPy, Polars) is
+only paid for by the page or function that actually uses it.
+
+install_import_profiler() times every module executed afterwards, self and
+cumulative, like `python -X importtime`, for the debug panel. It is opt-in:
+main.py installs it before its own imports when IMPORT_PROFILE=1, to cover
+the cold start, or on the first run with ?debug=1. Importing this module
+alone changes nothing, so CLIs and screener workers run unhooked.
+"""
+import importlib
+import sys
+import threading
+import time
+from collections import deque
+
+# Import records kept by the profile, far more modules than the app loads
+MAX_RECORDS = 20000
+
+
+class LazyModule:
+    """Stand-in for a module that imports it on first attribute access"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            # importlib holds the per-module import lock, so concurrent
+            # sessions touching the module at once import it only once
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    """The module if already imported, otherwise a LazyModule for it"""
+    return sys.modules.get(name) or LazyModule(name)
+
+
+class ImportProfile:
+    """
+    Per-module import times recorded by timing each loader's exec_module.
+    Time spent importing a module's own imports counts towards its cumulative
+    time only, as in -X importtime
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.records = deque(maxlen=MAX_RECORDS)
+        self.page_runs = deque(maxlen=100)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _timed(self, name, exec_module):
+        def timed_exec_module(module):
+            stack = self._local.__dict__.setdefault('stack', [])
+            stack.append(0.0)
+            started = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                cumulative = time.perf_counter() - started
+                children = stack.pop()
+                if stack:
+                    stack[-1] += cumulative
+                with self._lock:
+                    self.records.append({
+                        'module': name,
+                        'self_ms': (cumulative - children) * 1000,
+                        'cumulative_ms': cumulative * 1000,
+                        'depth': len(stack),
+                        'thread': threading.current_thread().name,
+                    })
+        return timed_exec_module
+
+    def record_page_run(self, page, seconds, modules_before):
+        """Note how long a page run took and how many modules it imported"""
+        with self._lock:
+            self.page_runs.append({
+                'page': page,
+                'seconds': seconds,
+                'new_modules': len(sys.modules) - modules_before,
+            })
+
+    def top_level(self):
+        """Records of imports not triggered by another timed import, slowest first"""
+        with self._lock:
+            records = [r for r in self.records if r['depth'] == 0]
+        return sorted(records, key=lambda r: r['cumulative_ms'], reverse=True)
+
+    def by_package(self):
+        """Self time summed per top-level package, slowest first"""
+        totals = {}
+        with self._lock:
+            for r in self.records:
+                package = r['module'].split('.')[0]
+                totals[package] = totals.get(package, 0.0) + r['self_ms']
+        return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+    def total_ms(self):
+        return sum(r['cumulative_ms'] for r in self.top_level())
+
+
+class _TimedFinder:
+    """
+    Stand-in for one meta-path finder: the same lookup, done once, with the
+    loader of every spec it finds timed
+    """
+
+    def __init__(self, finder, profile):
+        self.finder = finder
+        self.profile = profile
+
+    def find_spec(self, fullname, path=None, target=None):
+        spec = self.finder.find_spec(fullname, path, target)
+        loader = spec.loader if spec is not None else None
+        # Built-in and frozen importers are shared classes, not per-module
+        # loader objects, so they are left untimed rather than patched globally
+        if loader is not None and not isinstance(loader, type) and hasattr(loader, 'exec_module'):
+            loader.exec_module = self.profile._timed(fullname, loader.exec_module)
+        return spec
+
+    def __getattr__(self, attr):
+        # invalidate_caches and the like go to the real finder
+        return getattr(self.finder, attr)
+
+
+_profile = None
+_profile_lock = threading.Lock()
+
+
+def install_import_profiler():
+    """Start recording import times for the rest of the process, once"""
+    global _profile
+    with _profile_lock:
+        if _profile is None:
+            _profile = ImportProfile()
+            sys.meta_path[:] = [
+                _TimedFinder(finder, _profile) if hasattr(finder, 'find_spec') else finder
+                for finder in sys.meta_path
+            ]
+    return _profile
+
+
+def import_profile():
+    """The process-wide ImportProfile, or None when profiling is off"""
+    return _profile
+
+
+def loaded(*names):
+    """{name: whether the module has been imported} for the given names"""
+    return {name: name in sys.modules for name in names}
@@ -3,46 +3,24 @@ import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from datetime import datetime
 
+from analytics.regression import fit_range, perform_linear_regression, rolling_trend
+from analytics.series_index import series_index
+from downsample import downsample_line, ohlc_downsample
 
-def perform_linear_regression(df):
-    """Perform linear regression on the closing price."""
-    # Convert date to numerical format for regression
-    df['Date_Numeric'] = pd.to_datetime(df['Date']).map(datetime.toordinal)
 
-    # Prepare data for regression
-    X = df['Date_Numeric'].values.reshape(-1, 1)
-    y = df['Close'].values.reshape(-1, 1)
-
-    # Perform linear regression
-    model = LinearRegression()
-    model.fit(X, y)
-
-    # Calculate predicted values
-    df['Predicted_Price'] = model.predict(X)
-
-    # Calculate R-squared
-    r_squared = model.score(X, y)
-
-    # Calculate confidence intervals (95%)
-    n = len(df)
-    mse = np.sum((df['Close'] - df['Predicted_Price']) ** 2) / (n - 2)
-    x_mean = np.mean(X)
-
-    # Standard error of prediction
-    std_err = np.sqrt(mse * (1 + 1 / n + (X - x_mean) ** 2 / np.sum((X - x_mean) ** 2)))
-
-    # 95% prediction interval
-    df['Upper_Bound'] = df['Predicted_Price'] + 1.96 * std_err.flatten()
-    df['Lower_Bound'] = df['Predicted_Price'] - 1.96 * std_err.flatten()
-
-    return df, r_squared, model.coef_[0][0]
+def create_regression_plot(df, r_squared, slope, full_resolution=False):
+    """Create an interactive plot with stock data and regression analysis."""
+    # Reduce long windows to the chart's point budget unless full resolution is asked for
+    if full_resolution:
+        bars = {'x': df['Date'], 'open': df['Open'], 'high': df['High'], 'low': df['Low'],
+                'close': df['Close'], 'volume': df['Volume']}
+    else:
+        bars = ohlc_downsample(df['Date'], df['Open'], df['High'], df['Low'], df['Close'], df['Volume'])
 
+    lines = {column: downsample_line(df['Date'], df[column], not full_resolution)
+             for column in ['Predicted_Price', 'Upper_Bound', 'Lower_Bound']}
 
-def create_regression_plot(df, r_squared, slope):
-    """Create an interactive plot with stock data and regression analysis."""
     # Create figure with secondary y-axis for volume
     fig = make_subplots(rows=2, cols=1,
                         vertical_spacing=0.1,
@@ -52,11 +30,11 @@ def create_regression_plot(df, r_squared, slope):
     # Add candlestick chart
     fig.add_trace(
         go.Candlestick(
-            x=df['Date'],
-            open=df['Open'],
-            high=df['High'],
-            low=df['Low'],
-            close=df['Close'],
+            x=bars['x'],
+            open=bars['open'],
+            high=bars['high'],
+            low=bars['low'],
+            close=bars['close'],
             name="OHLC"
         ),
         row=1, col=1
@@ -65,8 +43,8 @@ def create_regression_plot(df, r_squared, slope):
     # Add regression line
     fig.add_trace(
         go.Scatter(
-            x=df['Date'],
-            y=df['Predicted_Price'],
+            x=lines['Predicted_Price'][0],
+            y=lines['Predicted_Price'][1],
             name="Regression Line",
             line=dict(color='red', width=2)
         ),
@@ -76,8 +54,8 @@ def create_regression_plot(df, r_squared, slope):
     # Add confidence intervals
     fig.add_trace(
         go.Scatter(
-            x=df['Date'],
-            y=df['Upper_Bound'],
+            x=lines['Upper_Bound'][0],
+            y=lines['Upper_Bound'][1],
             name='Upper Bound',
             line=dict(dash='dash', color='gray'),
             opacity=0.3
@@ -87,8 +65,8 @@ def create_regression_plot(df, r_squared, slope):
 
     fig.add_trace(
         go.Scatter(
-            x=df['Date'],
-            y=df['Lower_Bound'],
+            x=lines['Lower_Bound'][0],
+            y=lines['Lower_Bound'][1],
             name='Lower Bound',
             line=dict(dash='dash', color='gray'),
             fill='tonexty',
@@ -100,8 +78,8 @@ def create_regression_plot(df, r_squared, slope):
     # Add volume bars
     fig.add_trace(
         go.Bar(
-            x=df['Date'],
-            y=df['Volume'],
+            x=bars['x'],
+            y=bars['volume'],
             name='Volume'
         ),
         row=2, col=1
@@ -122,106 +100,150 @@ def create_regression_plot(df, r_squared, slope):
     return fig
 
 
-# Main Streamlit app
-st.title("Stock Price Regression Analysis")
+def create_rolling_trend_plot(trend, window_label, full_resolution=False):
+    """Plot the slope, R-squared and band position of the trend fitted at every date."""
+    trend = trend.dropna()
+    fig = make_subplots(rows=3, cols=1, shared_xaxes=True, vertical_spacing=0.06,
+                        subplot_titles=("Slope", "R-squared", "Position in Prediction Band"))
 
-if 'stock_data' in st.session_state:
-    # Make a copy and ensure numeric columns
-    stock_data = st.session_state['stock_data'].copy()
+    for row, column in enumerate(['Slope', 'R_Squared', 'Band_Position'], start=1):
+        x, y = downsample_line(trend.index, trend[column], not full_resolution)
+        fig.add_trace(go.Scatter(x=x, y=y, name=column.replace('_', ' ')), row=row, col=1)
 
-    # Convert Date column to datetime if it's not already
-    if not pd.api.types.is_datetime64_any_dtype(stock_data['Date']):
-        try:
-            stock_data['Date'] = pd.to_datetime(stock_data['Date'])
-        except Exception as e:
-            st.error(f"Error converting Date column to datetime: {str(e)}")
+    # Band edges: outside them the close is beyond the 95% prediction interval
+    for edge in (-1, 1):
+        fig.add_hline(y=edge, line_dash='dash', line_color='gray', row=3, col=1)
+    fig.add_hline(y=0, line_color='black', line_width=1, row=1, col=1)
+
+    fig.update_layout(
+        title=f"{window_label} Trend",
+        height=700,
+        showlegend=False,
+        hovermode='x unified'
+    )
+
+    return fig
+
+
+# Main Streamlit app
+if __name__ == "__main__":
+    st.title("Stock Price Regression Analysis")
+
+    if 'stock_data' in st.session_state:
+        # Make a copy and ensure numeric columns
+        stock_data = st.session_state['stock_data'].copy()
+
+        # Convert Date column to datetime if it's not already
+        if not pd.api.types.is_datetime64_any_dtype(stock_data['Date']):
+            try:
+                stock_data['Date'] = pd.to_datetime(stock_data['Date'])
+            except Exception as e:
+                st.error(f"Error converting Date column to datetime: {str(e)}")
+                st.stop()
+
+        full_resolution = st.sidebar.checkbox("Full resolution charts", value=False,
+                                              help="Send every bar to the browser instead of a downsampled series")
+
+        # Sort data by date
+        stock_data = stock_data.sort_values('Date')
+
+        # Verify required columns
+        required_columns = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
+        missing_columns = [col for col in required_columns if col not in stock_data.columns]
+        if missing_columns:
+            st.error(f"Missing required columns: {', '.join(missing_columns)}")
             st.stop()
 
-    # Sort data by date
-    stock_data = stock_data.sort_values('Date')
-
-    # Verify required columns
-    required_columns = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
-    missing_columns = [col for col in required_columns if col not in stock_data.columns]
-    if missing_columns:
-        st.error(f"Missing required columns: {', '.join(missing_columns)}")
-        st.stop()
-
-    # Ensure we have valid min and max dates
-    min_date = stock_data['Date'].min()
-    max_date = stock_data['Date'].max()
-
-    # Only create the date range slider if we have valid dates
-    if min_date != max_date:
-        date_range = st.slider(
-            "Select Date Range",
-            min_value=min_date.date(),
-            max_value=max_date.date(),
-            value=(min_date.date(), max_date.date())
-        )
-
-        # Filter data based on date range
-        mask = (stock_data['Date'].dt.date >= date_range[0]) & (stock_data['Date'].dt.date <= date_range[1])
-        filtered_data = stock_data.loc[mask]
-    else:
-        st.warning("Dataset contains only one date point. Showing all data.")
-        filtered_data = stock_data
-
-    try:
-        # Perform regression analysis
-        analyzed_data, r_squared, slope = perform_linear_regression(filtered_data)
-
-        # Create and display the plot
-        fig = create_regression_plot(analyzed_data, r_squared, slope)
-        st.plotly_chart(fig, use_container_width=True)
-
-        # Display statistics
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.metric("R-squared Value", f"{r_squared:.4f}")
-        with col2:
-            st.metric("Slope", f"{slope:.4f}")
-        with col3:
-            daily_return = analyzed_data['Close'].pct_change().mean() * 100
-            st.metric("Avg Daily Return", f"{daily_return:.2f}%")
-
-        # Technical Analysis Insights
-        st.subheader("Analysis Insights")
-
-        # Trend analysis
-        trend_strength = abs(slope)
-        trend_direction = "upward" if slope > 0 else "downward"
-
-        # Calculate additional metrics
-        volatility = analyzed_data['Close'].pct_change().std() * np.sqrt(252) * 100  # Annualized volatility
-
-        st.write(f"**Trend Analysis:**")
-        st.write(f"- The stock shows a {trend_direction} trend with a slope of {slope:.4f}")
-        st.write(f"- Annualized Volatility: {volatility:.2f}%")
-
-        # Volume Analysis
-        avg_volume = analyzed_data['Volume'].mean()
-        recent_volume = analyzed_data['Volume'].iloc[-5:].mean()
-        volume_trend = "higher" if recent_volume > avg_volume else "lower"
-
-        st.write(f"**Volume Analysis:**")
-        st.write(f"- Recent volume is {volume_trend} than average")
-        st.write(f"- Average Volume: {avg_volume:,.0f}")
-        st.write(f"- Recent Average Volume: {recent_volume:,.0f}")
-
-        # Price Position Analysis
-        latest_price = analyzed_data['Close'].iloc[-1]
-        predicted_price = analyzed_data['Predicted_Price'].iloc[-1]
-
-        st.write(f"**Price Position Analysis:**")
-        if latest_price > analyzed_data['Upper_Bound'].iloc[-1]:
-            st.write("- The stock is currently trading above its predicted range (potentially overbought)")
-        elif latest_price < analyzed_data['Lower_Bound'].iloc[-1]:
-            st.write("- The stock is currently trading below its predicted range (potentially oversold)")
+        # Ensure we have valid min and max dates
+        min_date = stock_data['Date'].iloc[0]
+        max_date = stock_data['Date'].iloc[-1]
+
+        # Only create the date range slider if we have valid dates
+        if min_date != max_date:
+            date_range = st.slider(
+                "Select Date Range",
+                min_value=min_date.date(),
+                max_value=max_date.date(),
+                value=(min_date.date(), max_date.date())
+            )
         else:
-            st.write("- The stock is trading within its predicted range")
+            st.warning("Dataset contains only one date point. Showing all data.")
+            date_range = (min_date.date(), max_date.date())
+
+        # Locate the range by binary search in the series' cached index and take
+        # the trend and average volume from its prefix sums, so moving the
+        # slider neither compares every date nor refits the window
+        series_key = (st.session_state.get('ticker'), 'Close', 'daily')
+        with series_index(series_key, stock_data['Date'], stock_data['Close'], stock_data['Volume']) as view:
+            start, stop = view.bounds(*date_range)
+            fit = fit_range(view, start, stop)
+            avg_volume = view.volume_mean(start, stop)
+        filtered_data = stock_data.iloc[start:stop].copy()
+
+        try:
+            # Perform regression analysis
+            analyzed_data, r_squared, slope = perform_linear_regression(filtered_data, fit)
+
+            # Create and display the plot
+            fig = create_regression_plot(analyzed_data, r_squared, slope, full_resolution)
+            st.plotly_chart(fig, use_container_width=True)
+
+            # Display statistics
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("R-squared Value", f"{r_squared:.4f}")
+            with col2:
+                st.metric("Slope", f"{slope:.4f}")
+            with col3:
+                daily_return = analyzed_data['Close'].pct_change().mean() * 100
+                st.metric("Avg Daily Return", f"{daily_return:.2f}%")
+
+            # Technical Analysis Insights
+            st.subheader("Analysis Insights")
+
+            # Trend analysis
+            trend_strength = abs(slope)
+            trend_direction = "upward" if slope > 0 else "downward"
+
+            # Calculate additional metrics
+            volatility = analyzed_data['Close'].pct_change().std() * np.sqrt(252) * 100  # Annualized volatility
+
+            st.write(f"**Trend Analysis:**")
+            st.write(f"- The stock shows a {trend_direction} trend with a slope of {slope:.4f}")
+            st.write(f"- Slope standard error: {fit.se_slope:.4f} (t = {fit.t_slope:.2f}, p = {fit.p_slope:.4f})")
+            st.write(f"- Annualized Volatility: {volatility:.2f}%")
+
+            # Volume Analysis
+            recent_volume = analyzed_data['Volume'].iloc[-5:].mean()
+            volume_trend = "higher" if recent_volume > avg_volume else "lower"
+
+            st.write(f"**Volume Analysis:**")
+            st.write(f"- Recent volume is {volume_trend} than average")
+            st.write(f"- Average Volume: {avg_volume:,.0f}")
+            st.write(f"- Recent Average Volume: {recent_volume:,.0f}")
+
+            # Price Position Analysis
+            latest_price = analyzed_data['Close'].iloc[-1]
+            predicted_price = analyzed_data['Predicted_Price'].iloc[-1]
+
+            st.write(f"**Price Position Analysis:**")
+            if latest_price > analyzed_data['Upper_Bound'].iloc[-1]:
+                st.write("- The stock is currently trading above its predicted range (potentially overbought)")
+            elif latest_price < analyzed_data['Lower_Bound'].iloc[-1]:
+                st.write("- The stock is currently trading below its predicted range (potentially oversold)")
+            else:
+                st.write("- The stock is trading within its predicted range")
+
+            # Trend refitted at every date of the range, from the same cached sums
+            st.subheader("Rolling Trend")
+            windows = {'Expanding': None, '3-Month': 63, '6-Month': 126, '1-Year': 252}
+            window_label = st.selectbox("Trend Window", list(windows), index=3)
+            trend = rolling_trend(series_key, filtered_data['Date'], filtered_data['Close'],
+                                  windows[window_label], volume=filtered_data['Volume'])
+            st.plotly_chart(create_rolling_trend_plot(trend, window_label, full_resolution),
+                            use_container_width=True)
 
-    except Exception as e:
-        st.error(f"An error occurred during analysis: {str(e)}")
-else:
-    st.error("No stock data found in session state. Please ensure data is loaded properly.")
\ No newline at end of file
+        except Exception as e:
+            st.error(f"An error occurred during analysis: {str(e)}")
+    else:
+        st.error("No stock data found in session state. Please ensure data is loaded properly.")
@@ -1,5 +1,61 @@
+import os
+import sys
+import threading
+import time
+
+from lazy_imports import import_profile, install_import_profiler, loaded
+
+# The import profile is opt-in: IMPORT_PROFILE=1 times the cold start from
+# here, ?debug=1 turns it on for every import after that page run
+if os.environ.get('IMPORT_PROFILE') == '1':
+    install_import_profiler()
+
+import pandas as pd
 import streamlit as st
 
+from prefetch import warm_cache
+
+# Libraries whose import cost the debug panel tracks
+HEAVY_LIBRARIES = ('pandas', 'polars', 'scipy', 'statsmodels', 'sklearn', 'plotly', 'yfinance')
+
+
+@st.cache_resource
+def start_price_warmup():
+    """Warm the shared price store for the whole universe once per server process"""
+    thread = threading.Thread(target=warm_cache, name='price-warmup', daemon=True)
+    thread.start()
+    return thread
+
+
+def show_import_profile(profile, top=25):
+    """Debug panel with the process's import times, opened with ?debug=1"""
+    with st.sidebar.expander("Import profile", expanded=True):
+        st.metric("Total import time", f"{profile.total_ms():,.0f} ms")
+        st.caption("Loaded: " + ", ".join(
+            f"{name} {'✅' if is_loaded else '—'}" for name, is_loaded in loaded(*HEAVY_LIBRARIES).items()
+        ))
+
+        st.markdown("**Slowest imports** (cumulative, like `-X importtime`)")
+        st.dataframe(pd.DataFrame(profile.top_level()[:top], columns=['module', 'cumulative_ms', 'self_ms', 'thread'])
+                     .round(1), hide_index=True, use_container_width=True)
+
+        st.markdown("**Self time by package**")
+        st.dataframe(pd.DataFrame(profile.by_package()[:top], columns=['package', 'self_ms']).round(1),
+                     hide_index=True, use_container_width=True)
+
+        if profile.page_runs:
+            st.markdown("**Page runs**")
+            st.dataframe(pd.DataFrame(list(profile.page_runs)).round(3), hide_index=True, use_container_width=True)
+
+
+if st.query_params.get('debug') == '1':
+    install_import_profiler()
+
+# Every page opens on a warm price store unless PRICE_WARMUP=0
+if os.environ.get('PRICE_WARMUP', '1') != '0':
+    start_price_warmup()
+
+
 # st.Page() is a function in Streamlit used to define a page in a multiple pages app.
 #   The first and only required argument defines page source, which can be a Python file or function,
 #       here is a .py file
@@ -51,7 +107,14 @@ page_list = [basic_info, retrieve_price, desc_stat, analyze_return_dist, analyze
 pg = st.navigation(page_list)
 
 # executing and rendering the multi-page navigation
+modules_before = len(sys.modules)
+started = time.perf_counter()
 pg.run()
+if import_profile() is not None:
+    import_profile().record_page_run(pg.title, time.perf_counter() - started, modules_before)
+
+if st.query_params.get('debug') == '1':
+    show_import_profile(import_profile())
 
 # Visualize the footer
 st.markdown("""
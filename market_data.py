@@ -0,0 +1,331 @@
+"""
+Market-data providers behind every price, index and company-info request.
+
+    MARKET_DATA_PROVIDER=yfinance             (default) live Yahoo Finance
+    MARKET_DATA_PROVIDER=replay:<directory>   recorded files, no network
+    MARKET_DATA_PROVIDER=synthetic[:<seed>]   deterministic GBM series, no network
+"""
+import json
+import os
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from ttl_cache import TTLCache
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Seconds an index close series stays cached for every session
+INDEX_CACHE_TTL = 15 * 60
+
+
+def as_date(value):
+    """Convert a date, datetime or Timestamp to a plain date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return pd.Timestamp(value).date()
+
+
+def empty_ohlcv():
+    """An OHLCV frame with no rows in the provider layout"""
+    return pd.DataFrame(columns=OHLCV_COLUMNS, index=pd.DatetimeIndex([], name='Date'))
+
+
+def normalize_ohlcv(df, ticker):
+    """
+    Bring a provider download into the common layout: a DatetimeIndex named 'Date'
+    and flat OHLCV columns without ticker symbols
+    """
+    if df is None or df.empty:
+        return empty_ohlcv()
+
+    df = df.copy()
+
+    # Flatten multi-index columns if they exist
+    if isinstance(df.columns, pd.MultiIndex):
+        if ticker in df.columns.get_level_values(-1):
+            df = df.xs(ticker, axis=1, level=-1)
+        elif ticker in df.columns.get_level_values(0):
+            df = df.xs(ticker, axis=1, level=0)
+        else:
+            df.columns = df.columns.get_level_values(0)
+
+    df = df[[col for col in OHLCV_COLUMNS if col in df.columns]]
+    df.index = pd.DatetimeIndex(df.index).tz_localize(None).normalize()
+    df.index.name = 'Date'
+    df = df.dropna(how='all')
+    return df[~df.index.duplicated(keep='last')].sort_index()
+
+
+class MarketDataProvider:
+    """
+    Interface for market data. Dates are inclusive on both ends.
+
+    Subclasses implement _history and _company_info; the public methods time
+    every call so provider latency can be inspected through `timings`.
+    """
+    name = 'base'
+
+    def __init__(self):
+        self.timings = deque(maxlen=500)
+
+    def _timed(self, method, symbols, func, *args):
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.timings.append({
+                'method': method,
+                'symbols': len(symbols) if isinstance(symbols, (list, tuple)) else 1,
+                'seconds': time.perf_counter() - started
+            })
+
+    def history(self, tickers, start, end):
+        """Daily OHLCV for several tickers as {ticker: DataFrame}, tickers without data left out"""
+        tickers = list(tickers)
+        return self._timed('history', tickers, self._history, tickers, as_date(start), as_date(end))
+
+    def index_closes(self, symbols, start, end):
+        """Daily closes of several index symbols as {symbol: Series}"""
+        return {symbol: df['Close'] for symbol, df in self.history(symbols, start, end).items()}
+
+    def company_info(self, ticker):
+        """Company profile as a yfinance-style info dict"""
+        return self._timed('company_info', ticker, self._company_info, ticker)
+
+    def _history(self, tickers, start, end):
+        raise NotImplementedError
+
+    def _company_info(self, ticker):
+        raise NotImplementedError
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Live data from Yahoo Finance, several tickers per download call"""
+    name = 'yfinance'
+
+    def _history(self, tickers, start, end):
+        import yfinance as yf
+
+        df = yf.download(tickers,
+                         start=start,
+                         end=end + timedelta(days=1),
+                         group_by='ticker',
+                         threads=True,
+                         progress=False)
+
+        batch = {}
+        for ticker in tickers:
+            ticker_df = normalize_ohlcv(df, ticker)
+            if not ticker_df.empty:
+                batch[ticker] = ticker_df
+        return batch
+
+    def _company_info(self, ticker):
+        import yfinance as yf
+
+        return yf.Ticker(ticker).info
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Replays recorded data: one '<symbol>.csv' OHLCV file and optionally one
+    '<symbol>.info.json' company-info file per symbol
+    """
+    name = 'replay'
+
+    def __init__(self, directory):
+        super().__init__()
+        self.directory = directory
+        self._frames = {}
+
+    def _load(self, symbol):
+        if symbol not in self._frames:
+            path = os.path.join(self.directory, f"{symbol}.csv")
+            if os.path.exists(path):
+                df = pd.read_csv(path, index_col='Date', parse_dates=True)
+                self._frames[symbol] = normalize_ohlcv(df, symbol)
+            else:
+                self._frames[symbol] = None
+        return self._frames[symbol]
+
+    def _history(self, tickers, start, end):
+        batch = {}
+        for ticker in tickers:
+            df = self._load(ticker)
+            if df is not None:
+                batch[ticker] = df.loc[pd.Timestamp(start):pd.Timestamp(end)]
+        return batch
+
+    def _company_info(self, ticker):
+        path = os.path.join(self.directory, f"{ticker}.info.json")
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+
+class SyntheticProvider(MarketDataProvider):
+    """
+    Deterministic geometric Brownian motion series of any length.
+
+    Each symbol gets its own random stream seeded from the provider seed and the
+    symbol name. Paths run forward on business days from `anchor`, and backward
+    from it on a second stream for earlier dates, so the same symbol and date
+    always give the same bar regardless of the range asked for.
+    """
+    name = 'synthetic'
+
+    def __init__(self, seed=0, mu=0.07, sigma=0.25, start_price=50.0, anchor=date(1980, 1, 1)):
+        super().__init__()
+        self.seed = seed
+        self.mu = mu
+        self.sigma = sigma
+        self.start_price = start_price
+        self.anchor = anchor
+
+    def _rng(self, symbol, backward=False):
+        key = [self.seed, zlib.crc32(symbol.encode('utf-8'))]
+        return np.random.default_rng(key + [1] if backward else key)
+
+    @staticmethod
+    def _weekdays(start, end):
+        # Weekday filter on a daily range, much cheaper than pd.bdate_range
+        dates = pd.date_range(start, end, freq='D', name='Date')
+        return dates[dates.dayofweek < 5]
+
+    def _log_returns(self, shocks):
+        dt = 1 / 252
+        return (self.mu - 0.5 * self.sigma ** 2) * dt + self.sigma * np.sqrt(dt) * shocks[:, 0]
+
+    def series(self, symbol, start, end):
+        """GBM OHLCV bars for one symbol on business days between start and end"""
+        # Bars from the anchor on walk forward from start_price; bars before it
+        # walk backward from the same price on their own stream, so neither
+        # depends on how far the requested range reaches
+        forward = self._weekdays(self.anchor, end)
+        backward = self._weekdays(start, self.anchor - timedelta(days=1))[::-1]
+
+        # One row of draws per bar, so extending the range never changes other bars
+        forward_shocks = self._rng(symbol).standard_normal((len(forward), 5))
+        backward_shocks = self._rng(symbol, backward=True).standard_normal((len(backward), 5))
+
+        log_returns = self._log_returns(forward_shocks)
+        forward_close = self.start_price * np.exp(np.cumsum(log_returns))
+        forward_previous = np.concatenate(([self.start_price], forward_close))[:len(forward_close)]
+
+        # Walking back, each bar closes where the next one started
+        log_returns = self._log_returns(backward_shocks)
+        backward_close = self.start_price * np.exp(-np.concatenate(([0.0], np.cumsum(log_returns)))[:len(log_returns)])
+        backward_previous = backward_close * np.exp(-log_returns)
+
+        dates = pd.DatetimeIndex(np.concatenate((backward[::-1].values, forward.values)), name='Date')
+        close = np.concatenate((backward_close[::-1], forward_close))
+        previous = np.concatenate((backward_previous[::-1], forward_previous))
+        shocks = np.concatenate((backward_shocks[::-1], forward_shocks))
+
+        open_ = previous * np.exp(0.002 * shocks[:, 1])
+        high = np.maximum(open_, close) * np.exp(np.abs(0.005 * shocks[:, 2]))
+        low = np.minimum(open_, close) * np.exp(-np.abs(0.005 * shocks[:, 3]))
+        volume = np.round(np.exp(14 + 0.5 * shocks[:, 4]))
+
+        df = pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume},
+                          index=dates)
+        return df.loc[pd.Timestamp(start):pd.Timestamp(end)]
+
+    def _history(self, tickers, start, end):
+        return {ticker: self.series(ticker, start, end) for ticker in tickers}
+
+    def _company_info(self, ticker):
+        return {
+            'longName': f"Synthetic {ticker}",
+            'sector': 'Synthetic',
+            'industry': 'Geometric Brownian Motion',
+            'country': 'Australia',
+            'longBusinessSummary': f"Deterministic GBM series (mu={self.mu}, sigma={self.sigma}).",
+        }
+
+
+def record(provider, symbols, directory, start, end):
+    """Record history and company info from a provider as ReplayProvider files"""
+    os.makedirs(directory, exist_ok=True)
+    for symbol, df in provider.history(symbols, start, end).items():
+        df.to_csv(os.path.join(directory, f"{symbol}.csv"))
+        if not symbol.startswith('^'):
+            with open(os.path.join(directory, f"{symbol}.info.json"), 'w', encoding='utf-8') as f:
+                json.dump(provider.company_info(symbol), f, indent=2, default=str)
+
+
+def provider_from_spec(spec):
+    """Build a provider from 'yfinance', 'replay:<directory>' or 'synthetic[:<seed>]'"""
+    name, _, arg = spec.partition(':')
+    if name == 'yfinance':
+        return YFinanceProvider()
+    if name == 'replay':
+        return ReplayProvider(arg)
+    if name == 'synthetic':
+        return SyntheticProvider(seed=int(arg) if arg else 0)
+    raise ValueError(f"Unknown market data provider: {spec}")
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider():
+    """Process-wide provider, chosen by the MARKET_DATA_PROVIDER environment variable"""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = provider_from_spec(os.environ.get('MARKET_DATA_PROVIDER', 'yfinance'))
+        return _provider
+
+
+def set_provider(provider):
+    """Swap the process-wide provider, e.g. for benchmarks and load tests"""
+    global _provider
+    with _provider_lock:
+        _provider = provider
+
+
+_index_cache = TTLCache(ttl=INDEX_CACHE_TTL)
+_index_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='index-fetch')
+
+
+def fetch_index_close(symbol, start, end):
+    """Close series of one index, cached per (provider, symbol, start, end) across sessions"""
+    provider = get_provider()
+    start, end = as_date(start), as_date(end)
+
+    def download():
+        closes = provider.index_closes([symbol], start, end)
+        if symbol not in closes or closes[symbol].empty:
+            raise ValueError("no data returned")
+        return closes[symbol]
+
+    return _index_cache.get_or_compute((provider.name, symbol, start, end), download)
+
+
+def fetch_index_closes(symbols, start, end):
+    """
+    Close series of several indices fetched concurrently, so page latency is
+    one round trip however many indices are configured.
+    Returns ({symbol: Series}, {symbol: error message})
+    """
+    futures = {symbol: _index_pool.submit(fetch_index_close, symbol, start, end) for symbol in symbols}
+
+    closes, errors = {}, {}
+    for symbol, future in futures.items():
+        try:
+            closes[symbol] = future.result()
+        except Exception as e:
+            errors[symbol] = str(e)
+    return closes, errors
@@ -0,0 +1,125 @@
+import numpy as np
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from downsample import candle_budget, DEFAULT_CHART_WIDTH, line_budget, lttb, ohlc_downsample
+from analytics.rolling import rolling_mean
+from ttl_cache import TTLCache
+
+# Prepared traces stay cached for an hour per (ticker, range, frequency)
+TRACE_CACHE_TTL = 60 * 60
+
+# Numeric bar colours validate far faster in plotly than one colour name per bar
+VOLUME_COLORSCALE = [[0, 'green'], [0.5, 'green'], [0.5, 'red'], [1, 'red']]
+
+_trace_cache = TTLCache(ttl=TRACE_CACHE_TTL, maxsize=64)
+
+
+def prepare_ohlcv_traces(df, ma_windows=(5, 20), series_key=None):
+    """
+    Derive every per-row array the OHLCV chart needs with array operations,
+    without touching the caller's DataFrame. Moving averages come from the
+    rolling prefix sums cached under series_key
+    """
+    open_ = df['Open'].to_numpy(dtype=float)
+    close = df['Close'].to_numpy(dtype=float)
+
+    return {
+        'x': df.index.to_numpy(),
+        'open': open_,
+        'high': df['High'].to_numpy(dtype=float),
+        'low': df['Low'].to_numpy(dtype=float),
+        'close': close,
+        'volume': df['Volume'].to_numpy(dtype=float),
+        # 1 for a down bar, 0 for an up bar, mapped to red/green by a colorscale
+        'down_bars': (open_ > close).astype(np.int8),
+        'moving_averages': {window: rolling_mean(series_key, df.index, close, window) for window in ma_windows},
+    }
+
+
+def get_ohlcv_traces(df, ticker, frequency):
+    """
+    Prepared traces for a ticker's chart, cached per (ticker, range, frequency)
+    so reruns and other sessions showing the same chart skip the preparation
+    """
+    if df.empty:
+        return prepare_ohlcv_traces(df)
+
+    key = (ticker, df.index[0], df.index[-1], len(df), df['Close'].iloc[-1], frequency)
+    series_key = (ticker, 'Close', frequency) if ticker else None
+    return _trace_cache.get_or_compute(key, lambda: prepare_ohlcv_traces(df, series_key=series_key))
+
+
+def downsample_traces(traces, width=DEFAULT_CHART_WIDTH):
+    """
+    Reduce prepared traces to the chart's point budget: candles and volume share
+    OHLC buckets, moving averages are reduced with LTTB
+    """
+    bars = ohlc_downsample(traces['x'], traces['open'], traces['high'], traces['low'],
+                           traces['close'], traces['volume'], candle_budget(width))
+    bars['down_bars'] = (bars['open'] > bars['close']).astype(np.int8)
+    bars['moving_averages'] = {
+        window: lttb(traces['x'], values, line_budget(width))
+        for window, values in traces['moving_averages'].items()
+    }
+    return bars
+
+
+def build_ohlcv_figure(traces, title, full_resolution=False):
+    """Create the OHLCV figure with moving averages from prepared traces"""
+    if not full_resolution:
+        traces = downsample_traces(traces)
+    else:
+        traces = dict(traces, moving_averages={
+            window: (traces['x'], values) for window, values in traces['moving_averages'].items()
+        })
+
+    # Create a plotly figure with two subplots stacked vertically
+    fig = make_subplots(rows=2, cols=1,
+                        row_heights=[0.6, 0.4],
+                        vertical_spacing=0.2,
+                        subplot_titles=(title, 'Volume'))
+
+    ma_colors = {5: 'orange', 20: 'blue'}
+    price_traces = [
+        go.Candlestick(
+            x=traces['x'],
+            open=traces['open'],
+            high=traces['high'],
+            low=traces['low'],
+            close=traces['close'],
+            name='OHLC'
+        )
+    ]
+    for window, (ma_x, ma_y) in traces['moving_averages'].items():
+        price_traces.append(
+            go.Scatter(
+                x=ma_x,
+                y=ma_y,
+                name=f'{window}-day MA',
+                line=dict(color=ma_colors.get(window, 'gray'), width=1),
+                hovertemplate="Date: %{x}<br>Close: $%{y:.2f}<extra></extra>"
+            )
+        )
+
+    volume_trace = go.Bar(
+        x=traces['x'],
+        y=traces['volume'],
+        name='Volume',
+        marker=dict(color=traces['down_bars'], colorscale=VOLUME_COLORSCALE, cmin=0, cmax=1),
+        hovertemplate="Date: %{x}<br>Volume: %{y}"
+    )
+
+    # Add all traces in one call instead of validating the figure once per trace
+    fig.add_traces(price_traces + [volume_trace],
+                   rows=[1] * len(price_traces) + [2],
+                   cols=[1] * (len(price_traces) + 1))
+
+    fig.update_layout(
+        height=800,
+        showlegend=True,
+        xaxis_rangeslider_visible=False,
+        template='plotly_white'
+    )
+
+    return fig
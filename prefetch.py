@@ -0,0 +1,121 @@
+"""
+Warm the shared price store for the whole ticker universe.
+
+    python prefetch.py                      # every ticker in universe.industries
+    python prefetch.py CBA.AX NAB.AX        # a user supplied list
+    python prefetch.py --fixture tests/data # offline, replaying recorded files
+    python prefetch.py --record tests/data  # download and record replay files
+    python prefetch.py --synthetic          # offline, deterministic GBM series
+"""
+import argparse
+import sys
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+from market_data import get_provider, record, ReplayProvider, SyntheticProvider
+from price_store import get_store, PriceStore
+from universe import all_tickers
+
+# Tickers per provider call, large enough to amortise the round trip while
+# keeping a single failed call from losing the whole universe
+BATCH_SIZE = 10
+
+
+def warm_cache(tickers=None, store=None, today=None):
+    """
+    Bring the price store up to date for every ticker in a few batched calls.
+
+    Tickers are grouped by the first day they are missing, so new tickers share
+    a full history download and stale ones share a short top-up download.
+    Returns one report row per ticker with its rows, seconds and status
+    """
+    tickers = list(tickers or all_tickers())
+    store = store or get_store()
+    today = today or date.today()
+
+    report = {}
+    groups = defaultdict(list)
+    for ticker in tickers:
+        fetch_start = store.pending_start(ticker, today)
+        if fetch_start is None:
+            report[ticker] = {'ticker': ticker, 'rows': 0, 'seconds': 0.0, 'status': 'current'}
+        else:
+            groups[fetch_start].append(ticker)
+
+    for fetch_start, group in groups.items():
+        for i in range(0, len(group), BATCH_SIZE):
+            chunk = group[i:i + BATCH_SIZE]
+            started = time.perf_counter()
+            try:
+                batch = store.provider.history(chunk, fetch_start, today)
+            except Exception as e:
+                for ticker in chunk:
+                    report[ticker] = {'ticker': ticker, 'rows': 0, 'seconds': 0.0,
+                                      'status': f"error: {e}"}
+                continue
+
+            # The batched call cannot be timed per ticker, so share it evenly
+            download_share = (time.perf_counter() - started) / len(chunk)
+
+            for ticker in chunk:
+                started = time.perf_counter()
+                if ticker not in batch or batch[ticker].empty:
+                    report[ticker] = {'ticker': ticker, 'rows': 0, 'seconds': download_share,
+                                      'status': 'error: no data returned'}
+                    continue
+                try:
+                    store.write(ticker, batch[ticker], checked_through=today)
+                    status = 'ok'
+                except Exception as e:
+                    status = f"error: {e}"
+                report[ticker] = {'ticker': ticker,
+                                  'rows': int(len(batch[ticker])),
+                                  'seconds': download_share + time.perf_counter() - started,
+                                  'status': status}
+
+    return [report[ticker] for ticker in tickers]
+
+
+def print_report(report, stream=sys.stdout):
+    """Print the per-ticker warm-up report and a summary line"""
+    stream.write(f"{'Ticker':<10}{'Rows':>8}{'Seconds':>10}  Status\n")
+    for row in report:
+        stream.write(f"{row['ticker']:<10}{row['rows']:>8}{row['seconds']:>10.2f}  {row['status']}\n")
+
+    failures = [row for row in report if row['status'].startswith('error')]
+    total = sum(row['seconds'] for row in report)
+    stream.write(f"{len(report) - len(failures)} of {len(report)} tickers warm in {total:.2f}s, "
+                 f"{len(failures)} failed\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prefetch OHLCV for the ticker universe into the price store")
+    parser.add_argument('tickers', nargs='*', help="tickers to prefetch (default: the whole universe)")
+    parser.add_argument('--store', help="price store directory (default: PRICE_STORE_DIR or ./data/prices)")
+    parser.add_argument('--fixture', help="replay recorded files from this directory instead of downloading")
+    parser.add_argument('--synthetic', action='store_true', help="use deterministic GBM series instead of downloading")
+    parser.add_argument('--record', help="download and record replay files into this directory, then exit")
+    args = parser.parse_args(argv)
+
+    tickers = args.tickers or all_tickers()
+
+    if args.record:
+        record(get_provider(), tickers, args.record, date.today() - timedelta(days=365 * 5), date.today())
+        return 0
+
+    if args.fixture:
+        provider = ReplayProvider(args.fixture)
+    elif args.synthetic:
+        provider = SyntheticProvider()
+    else:
+        provider = None
+    store = PriceStore(args.store or get_store().root, provider=provider)
+
+    report = warm_cache(tickers, store=store)
+    print_report(report)
+    return 1 if any(row['status'].startswith('error') for row in report) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
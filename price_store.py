@@ -0,0 +1,170 @@
+import json
+import os
+import threading
+from datetime import date, timedelta
+
+import pandas as pd
+
+from market_data import as_date, empty_ohlcv, get_provider
+
+# Location of the on-disk store, one Parquet file (partition) per ticker
+STORE_DIR = os.environ.get(
+    'PRICE_STORE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'prices')
+)
+
+# Earliest date the app lets a user pick, so the store keeps history back to it
+HISTORY_START = date(1980, 1, 1)
+
+# Rows per Parquet row group, roughly eight years of daily bars, so a date
+# filter only has to decode the row groups overlapping the requested slice
+ROW_GROUP_SIZE = 2048
+
+
+class PriceStore:
+    """
+    Persistent columnar OHLCV store keeping the full daily history of each ticker.
+
+    Reads return only the requested slice. When a request reaches past the last
+    day the store has checked with the provider, only the missing trailing days
+    are downloaded and merged into the ticker's partition.
+    """
+
+    def __init__(self, root=STORE_DIR, provider=None):
+        self.root = root
+        self._provider = provider
+        self._lock = threading.RLock()
+        self._manifest = None
+
+    @property
+    def provider(self):
+        """Provider used for top-ups, the process-wide one unless given explicitly"""
+        return self._provider or get_provider()
+
+    # Paths and manifest
+    def _path(self, ticker):
+        return os.path.join(self.root, f"{ticker}.parquet")
+
+    @property
+    def _manifest_path(self):
+        return os.path.join(self.root, '_manifest.json')
+
+    def _load_manifest(self):
+        if self._manifest is None:
+            try:
+                with open(self._manifest_path, 'r', encoding='utf-8') as f:
+                    self._manifest = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._manifest = {}
+        return self._manifest
+
+    def _save_manifest(self):
+        tmp_path = self._manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self._manifest_path)
+
+    def checked_through(self, ticker):
+        """Last day the provider has been asked about for this ticker, or None"""
+        entry = self._load_manifest().get(ticker)
+        return date.fromisoformat(entry['checked_through']) if entry else None
+
+    # Reading and writing partitions
+    def _read(self, ticker, start=None, end=None):
+        path = self._path(ticker)
+        if not os.path.exists(path):
+            return empty_ohlcv()
+
+        filters = []
+        if start is not None:
+            filters.append(('Date', '>=', pd.Timestamp(start)))
+        if end is not None:
+            filters.append(('Date', '<=', pd.Timestamp(end)))
+
+        return pd.read_parquet(path, filters=filters or None)
+
+    def _write(self, ticker, df):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self._path(ticker) + '.tmp'
+        df.to_parquet(tmp_path, row_group_size=ROW_GROUP_SIZE)
+        os.replace(tmp_path, self._path(ticker))
+
+    def write(self, ticker, df, checked_through=None):
+        """
+        Merge already downloaded bars into a ticker's partition and record how far
+        the provider has been checked
+        """
+        checked_through = as_date(checked_through or date.today())
+        with self._lock:
+            stored = self._read(ticker)
+            merged = pd.concat([stored, df]) if not stored.empty else df
+            merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+            self._write(ticker, merged)
+
+            manifest = self._load_manifest()
+            manifest[ticker] = {
+                'checked_through': checked_through.isoformat(),
+                'rows': int(len(merged))
+            }
+            self._save_manifest()
+
+    def pending_start(self, ticker, today=None):
+        """
+        First day that has to be downloaded to bring the partition up to today,
+        or None when it is already current. A new ticker, or one with no stored
+        bars, starts at HISTORY_START, a known one at its last stored bar
+        (re-fetched as it may have been captured intraday)
+        """
+        today = as_date(today or date.today())
+        checked = self.checked_through(ticker)
+        if checked is None:
+            return HISTORY_START
+        if checked >= today:
+            return None
+
+        stored = self._read(ticker, start=checked - timedelta(days=14))
+        if stored.empty:
+            # No recent bars: resume after the last stored one, if there is any
+            stored = self._read(ticker)
+        return stored.index[-1].date() if not stored.empty else HISTORY_START
+
+    def top_up(self, ticker, today=None):
+        """
+        Make sure the partition is current up to today. The first call downloads
+        the full history, later calls only the missing trailing days
+        """
+        today = as_date(today or date.today())
+        with self._lock:
+            fetch_start = self.pending_start(ticker, today)
+            if fetch_start is None:
+                return
+
+            new_rows = self.provider.history([ticker], fetch_start, today).get(ticker, empty_ohlcv())
+            if new_rows.empty:
+                # A failed download: leave the manifest as it is so the next
+                # load asks again instead of treating the ticker as current
+                return
+            self.write(ticker, new_rows, checked_through=today)
+
+    def load(self, ticker, start, end, refresh=True):
+        """
+        Return daily OHLCV for ticker between start and end (inclusive), only
+        touching the provider for days not yet checked. With refresh=False only
+        stored bars are read, as batch workers do after a single warm-up
+        """
+        start, end = as_date(start), as_date(end)
+        checked = self.checked_through(ticker)
+        if refresh and (checked is None or end > checked):
+            self.top_up(ticker)
+        return self._read(ticker, start, end)
+
+
+_default_store = None
+
+
+def get_store():
+    """Shared store instance used by every page and session"""
+    global _default_store
+    if _default_store is None:
+        _default_store = PriceStore()
+    return _default_store
@@ -1,34 +1,30 @@
 from datetime import datetime, timedelta
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
-import pandas_ta as ta
+
+from downsample import downsample_line, ohlc_downsample
+from analytics.indicators import get_indicators, MA_LENGTHS
+from lazy_imports import lazy_import
+from price_store import get_store
+
+# Only the area chart uses plotly express
+px = lazy_import('plotly.express')
 
 
 @st.cache_data
 def retrieve_data(ticker, s_date, e_date):
     """
-    Retrieve stock data for Australian market
+    Retrieve stock data for Australian market from the local price store,
+    which only downloads the trading days it has not seen yet
     """
     try:
-        # Download data
-        ticker_df = yf.download(ticker,
-                                start=s_date,
-                                end=e_date + timedelta(days=1))
+        ticker_df = get_store().load(ticker, s_date, e_date)
 
         if ticker_df.empty:
             st.error(f"No data found for {ticker}")
             return pd.DataFrame()
 
-        # Flatten multi-index columns if they exist
-        if isinstance(ticker_df.columns, pd.MultiIndex):
-            ticker_df.columns = [' '.join(col).strip() for col in ticker_df.columns]
-
-        # Remove ticker symbols from column names
-        ticker_df.columns = [col.split()[0] if len(col.split()) > 1 else col for col in ticker_df.columns]
-
         # Extract date component and create a Date column
         ticker_df['Date'] = ticker_df.index.date
         ticker_df = ticker_df.reset_index(drop=True)
@@ -83,19 +79,25 @@ def display_price_metrics(stock_data):
         )
 
 
-def visualize_data(stock_data, chart_type, indicator_type):
+def visualize_data(stock_data, chart_type, indicator, full_resolution=False):
     if stock_data.empty:
         st.warning("No data available for visualization")
         return
 
+    # Long histories are reduced to what the chart can show unless full resolution is asked for
+    downsample = not full_resolution
+
     if chart_type == "Line Chart":
+        indicator_label = indicator.name.replace('_', ' ').upper()
         fig = go.Figure()
+        close_x, close_y = downsample_line(stock_data['Date'], stock_data['Close'], downsample)
+        indicator_x, indicator_y = downsample_line(stock_data['Date'], indicator.to_numpy(), downsample)
 
         # Add closing price trace
         fig.add_trace(
             go.Scatter(
-                x=stock_data['Date'],
-                y=stock_data['Close'],
+                x=close_x,
+                y=close_y,
                 name='Close Price',
                 line=dict(color='blue', width=1.5),
                 hovertemplate="Date: %{x}<br>Close: $%{y:.2f}<extra></extra>"
@@ -105,16 +107,16 @@ def visualize_data(stock_data, chart_type, indicator_type):
         # Add indicator trace
         fig.add_trace(
             go.Scatter(
-                x=stock_data['Date'],
-                y=stock_data[indicator_type],
-                name=indicator_type.upper(),
+                x=indicator_x,
+                y=indicator_y,
+                name=indicator_label,
                 line=dict(color='red', width=1.5),
-                hovertemplate=f"{indicator_type.upper()}: $%{{y:.2f}}<br><extra></extra>"
+                hovertemplate=f"{indicator_label}: $%{{y:.2f}}<br><extra></extra>"
             )
         )
 
         fig.update_layout(
-            title=f'Price and {indicator_type.upper()} - {stock_data["ticker"].iloc[0].replace(".AX", "")}',
+            title=f'Price and {indicator_label} - {stock_data["ticker"].iloc[0].replace(".AX", "")}',
             xaxis_title='Date',
             yaxis_title='Price (AUD)',
             hovermode='x unified',
@@ -131,12 +133,19 @@ def visualize_data(stock_data, chart_type, indicator_type):
         st.plotly_chart(fig, use_container_width=True)
 
     elif chart_type == "Candlestick":
+        if downsample:
+            bars = ohlc_downsample(stock_data['Date'], stock_data['Open'], stock_data['High'],
+                                   stock_data['Low'], stock_data['Close'])
+        else:
+            bars = {'x': stock_data['Date'], 'open': stock_data['Open'], 'high': stock_data['High'],
+                    'low': stock_data['Low'], 'close': stock_data['Close']}
+
         fig = go.Figure(data=[go.Candlestick(
-            x=stock_data['Date'],
-        open=stock_data['Open'],
-            high=stock_data['High'],
-            low=stock_data['Low'],
-            close=stock_data['Close']
+            x=bars['x'],
+            open=bars['open'],
+            high=bars['high'],
+            low=bars['low'],
+            close=bars['close']
         )])
 
         # Update layout with more details
@@ -150,7 +159,8 @@ def visualize_data(stock_data, chart_type, indicator_type):
         st.plotly_chart(fig, use_container_width=True)
 
     elif chart_type == "Area Chart":
-        fig = px.area(stock_data,
+        volume_x, volume_y = downsample_line(stock_data['Date'], stock_data['Volume'], downsample)
+        fig = px.area(pd.DataFrame({'Date': volume_x, 'Volume': volume_y}),
                       x='Date',
                       y='Volume',
                       title=f'Trading Volume - {stock_data["ticker"].iloc[0].replace(".AX", "")}')
@@ -187,21 +197,13 @@ def visualize_data(stock_data, chart_type, indicator_type):
         st.plotly_chart(fig, use_container_width=True)
 
 
-def calculate_indicators(stock_data, indicator_type):
-    if indicator_type == "dema":
-        stock_data["dema"] = ta.dema(stock_data["Close"], length=10)
-        return stock_data[stock_data["dema"] > 0]
-    elif indicator_type == "ema":
-        stock_data["ema"] = ta.ema(stock_data["Close"], length=10)
-        return stock_data[stock_data["ema"] > 0]
-    elif indicator_type == "sma":
-        stock_data["sma"] = ta.sma(stock_data["Close"], length=10)
-        stock_data = stock_data[stock_data["sma"] > 0]
-        return stock_data
-    elif indicator_type == "wma":
-        stock_data["wma"] = ta.wma(stock_data["Close"], length=10)
-        stock_data = stock_data[stock_data["wma"] > 0]
-        return stock_data
+def calculate_indicators(stock_data, ticker):
+    """
+    Every indicator of the batch engine for the selected range, cached per
+    series version. stock_data itself is shared through the session and is
+    left untouched
+    """
+    return get_indicators(stock_data, ticker)
 
 
 # Main execution flow
@@ -235,6 +237,9 @@ with st.sidebar:
         "Select the Overlap Indicator",
         ["dema", "ema", "sma", "wma"]
     )
+    indicator_length = st.selectbox("Indicator Length", MA_LENGTHS)
+    full_resolution = st.checkbox("Full resolution charts", value=False,
+                                  help="Send every bar to the browser instead of a downsampled series")
 
 ticker = st.session_state['ticker']
 stock_data = retrieve_data(ticker, start_date, end_date)
@@ -253,7 +258,7 @@ if not stock_data.empty:
             use_container_width=True
         )
 
-    indicator_result = calculate_indicators(stock_data, indicator_type)
+    indicators = calculate_indicators(stock_data, ticker)
     # Display enhanced charts
-    visualize_data(stock_data, chart_type, indicator_type)
+    visualize_data(stock_data, chart_type, indicators[f'{indicator_type}_{indicator_length}'], full_resolution)
     st.session_state['stock_data'] = stock_data
@@ -1,97 +1,14 @@
+from functools import partial
+
 import streamlit as st
 import polars as pl
 import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from scipy import stats
 import numpy as np
 
-
-def calculate_returns(pl_df: pl.DataFrame, period: str = 'daily') -> pl.DataFrame:
-    """
-    Calculate returns for different periods
-    period: 'daily', 'weekly', or 'monthly'
-    """
-    pl_df = pl_df.with_columns([
-        pl.col('Date').str.strptime(pl.Date, '%Y-%m-%d').alias('DateCol')
-    ])
-
-    if period == 'daily':
-        returns = pl_df.select([
-            pl.col('Date'),
-            pl.col('Close').pct_change().fill_null(0).alias('Return')
-        ])
-    else:
-        # Add period columns for grouping
-        pl_df = pl_df.with_columns([
-            pl.col('DateCol').dt.year().alias('Year'),
-            pl.col('DateCol').dt.week().alias('Week'),
-            pl.col('DateCol').dt.month().alias('Month')
-        ])
-
-        if period == 'weekly':
-            grouped = pl_df.group_by(['Year', 'Week']).agg([
-                pl.col('Close').last().alias('Price'),
-                pl.col('Date').last().alias('Date')
-            ]).sort('Date')
-        else:  # monthly
-            grouped = pl_df.group_by(['Year', 'Month']).agg([
-                pl.col('Close').last().alias('Price'),
-                pl.col('Date').last().alias('Date')
-            ]).sort('Date')
-
-        returns = grouped.select([
-            pl.col('Date'),
-            pl.col('Price').pct_change().fill_null(0).alias('Return')
-        ])
-
-    return returns
-
-
-def analyze_returns_distribution(returns: pl.DataFrame, period: str) -> dict:
-    """
-    Analyze the distribution of returns with proper period scaling
-    """
-    returns_array = returns.select('Return').to_numpy().flatten()
-
-    # Scale factors for different periods
-    if period == 'Weekly':
-        scale_factor = 52  # weeks in a year
-    elif period == 'Monthly':
-        scale_factor = 12  # months in a year
-    else:  # Daily
-        scale_factor = 252  # trading days in a year
-
-    # Calculate scaled statistics
-    mean_return = np.mean(returns_array)
-    std_dev = np.std(returns_array)
-
-    # Annualize mean and std dev
-    annualized_mean = mean_return * scale_factor
-    annualized_std = std_dev * np.sqrt(scale_factor)
-
-    basic_stats = {
-        f'{period} Mean (%)': float(mean_return * 100),
-        f'Annualized Mean (%)': float(annualized_mean * 100),
-        f'{period} Std Dev (%)': float(std_dev * 100),
-        'Annualized Volatility (%)': float(annualized_std * 100),
-        f'{period} Minimum (%)': float(np.min(returns_array) * 100),
-        f'{period} Maximum (%)': float(np.max(returns_array) * 100),
-        'Skewness': float(stats.skew(returns_array)),
-        'Excess Kurtosis': float(stats.kurtosis(returns_array))
-    }
-
-    # Normality tests
-    shapiro_stat, shapiro_p = stats.shapiro(returns_array)
-    jb_stat, jb_p = stats.jarque_bera(returns_array)
-
-    normality_tests = {
-        'Shapiro-Wilk p-value': shapiro_p,
-        'Jarque-Bera p-value': jb_p
-    }
-
-    return {'basic_stats': basic_stats, 'normality_tests': normality_tests}
-
+from analytics.returns import analyze_period, compute_distribution_views, PERIODS
+from ttl_cache import get_cache, precompute
 
 def visualize_returns_distribution(returns_data: dict, period: str):
     """
@@ -108,20 +25,18 @@ def visualize_returns_distribution(returns_data: dict, period: str):
         )
     )
 
-    returns_array = returns_data['returns'].select('Return').to_numpy().flatten()
-    dates = returns_data['returns'].select('Date').to_numpy().flatten()
-
-    # Histogram with KDE
-    hist_values, hist_bins = np.histogram(returns_array, bins=50, density=True)
-    kde_x = np.linspace(min(returns_array), max(returns_array), 100)
-    kde = stats.gaussian_kde(returns_array)
+    views = returns_data.get('views') or compute_distribution_views(returns_data['returns'], period)
+    returns_array = views['returns_array']
+    dates = views['dates']
+    qq = views['qq']
 
+    hist_x, hist_widths, hist_density = views['hist']
     fig.add_trace(
-        go.Histogram(
-            x=returns_array,
+        go.Bar(
+            x=hist_x,
+            y=hist_density,
+            width=hist_widths,
             name='Returns',
-            histnorm='probability density',
-            nbinsx=50,
             showlegend=False
         ),
         row=1, col=1
@@ -129,8 +44,8 @@ def visualize_returns_distribution(returns_data: dict, period: str):
 
     fig.add_trace(
         go.Scatter(
-            x=kde_x,
-            y=kde(kde_x),
+            x=views['kde_x'],
+            y=views['kde_y'],
             name='KDE',
             line=dict(color='red'),
             showlegend=False
@@ -139,7 +54,6 @@ def visualize_returns_distribution(returns_data: dict, period: str):
     )
 
     # QQ Plot
-    qq = stats.probplot(returns_array)
     fig.add_trace(
         go.Scatter(
             x=qq[0][0],
@@ -177,14 +91,10 @@ def visualize_returns_distribution(returns_data: dict, period: str):
     )
 
     # Rolling Volatility
-    rolling_vol = pd.Series(returns_array).rolling(
-        window=20 if period == 'Daily' else 5
-    ).std() * np.sqrt(252 if period == 'Daily' else 52 if period == 'Weekly' else 12)
-
     fig.add_trace(
         go.Scatter(
             x=dates,
-            y=rolling_vol,
+            y=views['rolling_vol'],
             mode='lines',
             name='Rolling Volatility',
             line=dict(color='orange'),
@@ -197,6 +107,7 @@ def visualize_returns_distribution(returns_data: dict, period: str):
     fig.update_layout(
         height=800,
         showlegend=False,
+        bargap=0,
         title_text=f"{period} Returns Analysis"
     )
 
@@ -236,11 +147,11 @@ def display_analysis_results(returns_data: pl.DataFrame, analysis_results: dict,
             # Add specific period information
             if period == 'Weekly':
                 period_info = returns_data['returns'].with_columns([
-                    pl.col('Date').str.strptime(pl.Date, '%Y-%m-%d').dt.strftime('Week %W, %Y').alias('Period')
+                    pl.col('Date').dt.strftime('Week %W, %Y').alias('Period')
                 ])
             else:  # Monthly
                 period_info = returns_data['returns'].with_columns([
-                    pl.col('Date').str.strptime(pl.Date, '%Y-%m-%d').dt.strftime('%B %Y').alias('Period')
+                    pl.col('Date').dt.strftime('%B %Y').alias('Period')
                 ])
 
             st.markdown(f"#### {period} Period Information")
@@ -267,30 +178,43 @@ def display_analysis_results(returns_data: pl.DataFrame, analysis_results: dict,
             st.dataframe(tests_df.style.format("{:.4f}"))
 
 
-if 'stock_data' in st.session_state:
-    # Convert to Polars DataFrame
-    pl_dataframe = pl.from_pandas(st.session_state['stock_data'])
-    pl_dataframe = pl_dataframe.with_columns(
-        pl.col('Date').dt.strftime('%Y-%m-%d').alias('Date')
-    )
+if __name__ == "__main__":
+    if 'stock_data' in st.session_state:
+        stock_data = st.session_state['stock_data']
 
-    # Calculate returns for different periods and analyze them
-    returns_data = {}
-    for period in ['Daily', 'Weekly', 'Monthly']:
-        returns = calculate_returns(pl_dataframe, period.lower())
-        analysis = analyze_returns_distribution(returns, period)
-        returns_data[period] = {
-            'returns': returns,
-            'analysis': analysis
-        }
+        # Convert to Polars DataFrame, keeping Date as a native date column
+        pl_dataframe = pl.from_pandas(stock_data[['Date', 'Close']])
 
-    # Create tabs for different periods
-    tabs = st.tabs(['Daily Returns', 'Weekly Returns', 'Monthly Returns'])
+        # Only the selected period is analysed, memoized per (ticker, range, period)
+        # in a cache shared by every session; the other periods are precomputed in
+        # the background so switching to them is instant. The returns of all three
+        # come from one Polars collect, shared through the period_returns cache
+        period = st.radio(
+            "Return Period",
+            PERIODS,
+            format_func=lambda p: f"{p} Returns",
+            horizontal=True,
+            label_visibility="collapsed"
+        )
 
-    for tab, period in zip(tabs, ['Daily', 'Weekly', 'Monthly']):
-        with tab:
-            period_data = returns_data[period]
-            # Display analysis results including visualizations and data
-            display_analysis_results(period_data, period_data['analysis'], period)
-else:
-    st.warning('⚠️ No data available. Please select a ticker in the menu of "Company Info" !')
\ No newline at end of file
+        series_key = (
+            st.session_state.get('ticker'),
+            stock_data['Date'].iloc[0],
+            stock_data['Date'].iloc[-1],
+            len(stock_data),
+            float(stock_data['Close'].iloc[-1])
+        )
+        analysis_cache = get_cache('return_distribution', ttl=60 * 60, maxsize=64)
+
+        period_data = analysis_cache.get_or_compute(series_key + (period,),
+                                                    lambda: analyze_period(pl_dataframe, period, series_key[0],
+                                                                           series_key))
+        for other_period in PERIODS:
+            if other_period != period:
+                precompute(analysis_cache, series_key + (other_period,),
+                           partial(analyze_period, pl_dataframe, other_period, series_key[0], series_key))
+
+        # Display analysis results including visualizations and data
+        display_analysis_results(period_data, period_data['analysis'], period)
+    else:
+        st.warning('⚠️ No data available. Please select a ticker in the menu of "Company Info" !')
@@ -0,0 +1,176 @@
+"""
+Screen the ticker universe headlessly with the analytics behind the pages.
+
+    python screener.py                            # every ticker in universe.industries
+    python screener.py CBA.AX NAB.AX -o banks.csv # a user supplied list, written as CSV
+    python screener.py --years 10 --workers 8     # ten years of history on eight processes
+    python screener.py --synthetic                # offline, deterministic GBM series
+
+Each ticker gets one row of descriptive statistics, return-distribution
+statistics per period, monthly and calendar-effect seasonality t-tests,
+return autocorrelation, the full-history and rolling linear regression trend
+and the latest technical indicators. The price store is brought up to date
+once in this process; worker processes then only read their partitions.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from functools import partial
+
+import pandas as pd
+import polars as pl
+
+from analytics.indicators import compute_indicators
+from analytics.regression import perform_linear_regression, rolling_trend, TREND_WINDOW
+from analytics.returns import analyze_returns_distribution, calculate_all_returns
+from analytics.seasonality import autocorrelation_summary, seasonality_summary
+from analytics.stats import calculate_statistics
+from market_data import ReplayProvider, SyntheticProvider
+from prefetch import warm_cache
+from price_store import get_store, PriceStore
+from universe import all_tickers
+
+DEFAULT_YEARS = 20
+DEFAULT_OUTPUT = 'screen.parquet'
+
+# Store used by a worker process, set by the pool initializer
+_worker_store = None
+
+
+def _init_worker(store_root):
+    global _worker_store
+    _worker_store = PriceStore(store_root)
+
+
+def return_columns(df):
+    """Return-distribution statistics and normality p-values for every period"""
+    pl_df = pl.from_pandas(df['Close'].rename_axis('Date').reset_index())
+    columns = {}
+    for period, returns in calculate_all_returns(pl_df).items():
+        analysis = analyze_returns_distribution(returns, period)
+        for name, value in {**analysis['basic_stats'], **analysis['normality_tests']}.items():
+            columns[name if name.startswith(period) else f'{period} {name}'] = value
+    return columns
+
+
+def regression_columns(df):
+    """
+    Slope (price per day) and R-squared of the linear trend over the whole
+    history, and the latest fit over the trailing trend window
+    """
+    _, r_squared, slope = perform_linear_regression(df['Close'].rename_axis('Date').reset_index())
+    latest = rolling_trend(None, df.index, df['Close'], TREND_WINDOW).iloc[-1]
+    return {
+        'Trend Slope': slope,
+        'Trend R-squared': r_squared,
+        **{f'{TREND_WINDOW}d Trend {name.replace("_", " ")}': value for name, value in latest.items()},
+    }
+
+
+def screen_ticker(ticker, start, end, store=None):
+    """One result row for a ticker, with its status instead of raising"""
+    store = store or _worker_store or get_store()
+    started = time.perf_counter()
+    row = {'ticker': ticker}
+    try:
+        df = store.load(ticker, start, end, refresh=False)
+        if len(df) < 3:
+            row.update(rows=len(df), status='error: not enough stored data')
+            return row
+
+        with warnings.catch_warnings():
+            # Sample-size warnings from scipy would flood the console for a universe
+            warnings.simplefilter('ignore')
+            row.update(rows=len(df), first_date=df.index[0].date(), last_date=df.index[-1].date())
+            row.update(calculate_statistics(df).to_dict())
+            row.update(return_columns(df))
+            row.update(seasonality_summary(df))
+            row.update(autocorrelation_summary(df['Close'].pct_change().dropna()))
+            row.update(regression_columns(df))
+            row.update(compute_indicators(df['Close']).iloc[-1].to_dict())
+        row['status'] = 'ok'
+    except Exception as e:
+        row['status'] = f"error: {e}"
+    row['seconds'] = time.perf_counter() - started
+    return row
+
+
+def run_screen(tickers=None, start=None, end=None, store=None, workers=None, refresh=True):
+    """
+    Screen tickers in a process pool and return one DataFrame row per ticker,
+    in the order given
+    """
+    tickers = list(tickers or all_tickers())
+    store = store or get_store()
+    end = end or date.today()
+    start = start or end - timedelta(days=365 * DEFAULT_YEARS)
+    workers = workers or os.cpu_count() or 1
+
+    if refresh:
+        warm_cache(tickers, store=store)
+
+    if workers == 1:
+        rows = [screen_ticker(ticker, start, end, store) for ticker in tickers]
+    else:
+        chunksize = max(1, len(tickers) // (workers * 4))
+        # Spawned, not forked: Polars' thread pool is already running in this
+        # process and can deadlock a forked child
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(store.root,)) as pool:
+            rows = list(pool.map(partial(screen_ticker, start=start, end=end), tickers,
+                                 chunksize=chunksize))
+
+    return pd.DataFrame(rows)
+
+
+def write_results(results, path):
+    """Write the results table as CSV or Parquet, chosen by the file extension"""
+    if path.lower().endswith('.csv'):
+        results.to_csv(path, index=False)
+    else:
+        results.to_parquet(path, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Screen the ticker universe with every page's analytics")
+    parser.add_argument('tickers', nargs='*', help="tickers to screen (default: the whole universe)")
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT,
+                        help=f"results file, .parquet or .csv (default: {DEFAULT_OUTPUT})")
+    parser.add_argument('--years', type=int, default=DEFAULT_YEARS,
+                        help=f"years of history up to today (default: {DEFAULT_YEARS})")
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument('--store', help="price store directory (default: PRICE_STORE_DIR or ./data/prices)")
+    parser.add_argument('--no-refresh', action='store_true', help="screen stored bars without topping up the store")
+    parser.add_argument('--fixture', help="replay recorded files from this directory instead of downloading")
+    parser.add_argument('--synthetic', action='store_true', help="use deterministic GBM series instead of downloading")
+    args = parser.parse_args(argv)
+
+    if args.fixture:
+        provider = ReplayProvider(args.fixture)
+    elif args.synthetic:
+        provider = SyntheticProvider()
+    else:
+        provider = None
+    store = PriceStore(args.store or get_store().root, provider=provider)
+
+    started = time.perf_counter()
+    end = date.today()
+    results = run_screen(args.tickers, end - timedelta(days=365 * args.years), end,
+                         store=store, workers=args.workers, refresh=not args.no_refresh)
+    write_results(results, args.output)
+
+    failures = results[results['status'] != 'ok']
+    for row in failures.itertuples():
+        sys.stdout.write(f"{row.ticker:<10}{row.status}\n")
+    sys.stdout.write(f"{len(results) - len(failures)} of {len(results)} tickers screened in "
+                     f"{time.perf_counter() - started:.1f}s, written to {args.output}\n")
+    return 1 if len(failures) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+Sentence segmentation of article bodies for the verification form.
+
+A SentenceIndex is built once per article when its upload is loaded: the
+(start, stop) offsets of every sentence in the body, the sentence each
+`*_sentence` claim field was found in, and the highlighted context shown
+for it (the sentence before, the claim sentence, and the sentence after up
+to any [link]). Rendering a claim is then a dictionary lookup instead of a
+split and scan of the body on every rerun. Large uploads are indexed in
+batches on a worker pool while the first pages are shown.
+"""
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+# Sentence end punctuation, whitespace, then a capital letter
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+(?=[A-Z])')
+
+HIGHLIGHT = "<b style='background-color: #e80000;'>{}</b>"
+
+# Articles indexed per task on the worker pool
+INDEX_BATCH = 200
+
+_index_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='sentence-index')
+
+
+def _text(value):
+    """Text of a field stored either as a string or as {'S': value}"""
+    if isinstance(value, dict) and 'S' in value:
+        return value['S']
+    return str(value)
+
+
+def sentence_spans(text):
+    """(start, stop) offsets of the non-empty, stripped sentences of text"""
+    spans, start = [], 0
+    boundaries = [(match.start(), match.end()) for match in SENTENCE_BOUNDARY.finditer(text)]
+    for stop, next_start in boundaries + [(len(text), len(text))]:
+        segment = text[start:stop]
+        stripped = segment.strip()
+        if stripped:
+            lead = len(segment) - len(segment.lstrip())
+            spans.append((start + lead, start + lead + len(stripped)))
+        start = next_start
+    return spans
+
+
+class SentenceIndex:
+    """Sentences of one article's body and where each claim sentence sits among them"""
+
+    def __init__(self, article):
+        body = _text(article.get('body') or '')
+        self.body = body if isinstance(body, str) else str(body)
+        self.spans = sentence_spans(self.body)
+        self.claims = {}
+        self.contexts = {}
+        for field, value in article.items():
+            target = _text(value)
+            # Fields that are not a single sentence are reported when rendered
+            if field.endswith('_sentence') and isinstance(target, str):
+                position = self.find(target)
+                self.claims[field] = position
+                self.contexts[field] = self._context(target, position)
+
+    def __len__(self):
+        return len(self.spans)
+
+    def sentence(self, position):
+        start, stop = self.spans[position]
+        return self.body[start:stop]
+
+    def find(self, target):
+        """Position of the first sentence containing target, -1 when none does"""
+        target = target.strip()
+        return next((i for i, (start, stop) in enumerate(self.spans) if target in self.body[start:stop]), -1)
+
+    def _context(self, target, position):
+        if position < 0:
+            return HIGHLIGHT.format(target)
+
+        context = []
+        if position > 0:
+            context.append(self.sentence(position - 1))
+        context.append(self.sentence(position))
+        if position < len(self) - 1:
+            # The sentence after, cut before any [link]
+            context.append(self.sentence(position + 1).split('[link]')[0].strip())
+        return " ".join(context).replace(target, HIGHLIGHT.format(target))
+
+    def context(self, field):
+        """Highlighted claim sentence of field with one sentence either side"""
+        return self.contexts[field]
+
+
+def build_indexes(articles, start=0, stop=None):
+    """SentenceIndex of every article in articles[start:stop]"""
+    return [SentenceIndex(article) for article in articles[start:stop]]
+
+
+def submit_batches(articles, start, stop, done):
+    """
+    Index articles[start:stop] on the worker pool in INDEX_BATCH chunks,
+    calling done(batch_start, indexes) as each chunk completes
+    """
+    for batch_start in range(start, stop, INDEX_BATCH):
+        batch_stop = min(batch_start + INDEX_BATCH, stop)
+        future = _index_pool.submit(build_indexes, articles, batch_start, batch_stop)
+        future.add_done_callback(lambda future, batch_start=batch_start: done(batch_start, future.result()))
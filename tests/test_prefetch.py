@@ -0,0 +1,31 @@
+"""Offline warm-up of the price store against recorded replay files in tests/data"""
+import os
+from datetime import date
+
+import pandas as pd
+
+from market_data import ReplayProvider
+from prefetch import warm_cache
+from price_store import PriceStore
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'data')
+TODAY = date(2024, 1, 15)
+
+
+def test_warm_cache_from_fixture(tmp_path):
+    store = PriceStore(str(tmp_path), provider=ReplayProvider(FIXTURES))
+
+    report = warm_cache(['CBA.AX', 'NAB.AX', 'XYZ.AX'], store=store, today=TODAY)
+
+    status = {row['ticker']: row['status'] for row in report}
+    assert status == {'CBA.AX': 'ok', 'NAB.AX': 'ok', 'XYZ.AX': 'error: no data returned'}
+    for ticker in ('CBA.AX', 'NAB.AX'):
+        recorded = pd.read_csv(os.path.join(FIXTURES, f'{ticker}.csv'), index_col='Date', parse_dates=True)
+        stored = store.load(ticker, date(2024, 1, 1), TODAY, refresh=False)
+        pd.testing.assert_frame_equal(stored, recorded, check_freq=False, check_dtype=False)
+        assert store.checked_through(ticker) == TODAY
+
+    # The failed ticker is not recorded as checked, so the next run asks again
+    assert store.checked_through('XYZ.AX') is None
+    rerun = {row['ticker']: row['status'] for row in warm_cache(['CBA.AX', 'XYZ.AX'], store=store, today=TODAY)}
+    assert rerun == {'CBA.AX': 'current', 'XYZ.AX': 'error: no data returned'}
@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache whose entries expire after `ttl` seconds.
+
+    Lives in an imported module rather than a page script, so every Streamlit
+    session and rerun in the server process shares it. get_or_compute lets only
+    one caller compute a missing key while concurrent callers wait for its result.
+    """
+
+    def __init__(self, ttl, maxsize=256):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def get(self, key, default=None):
+        """Cached value for key, or default when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def get_or_compute(self, key, compute):
+        """Cached value for key, calling compute() once to fill it when missing"""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        try:
+            with key_lock:
+                value = self.get(key, _MISSING)
+                if value is _MISSING:
+                    value = compute()
+                    self.set(key, value)
+        finally:
+            # Also when compute() raises, or failing keys would each leave a lock
+            with self._lock:
+                self._key_locks.pop(key, None)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_MISSING = object()
+
+_caches = {}
+_caches_lock = threading.Lock()
+_pending = set()
+
+# Low-priority workers for precomputing results nobody is waiting for yet
+_precompute_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='precompute')
+
+
+def get_cache(name, ttl, maxsize=256):
+    """
+    Process-wide named cache. Page scripts are re-executed on every rerun, so
+    they look their cache up by name instead of holding it in a module global
+    """
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = TTLCache(ttl, maxsize)
+        return _caches[name]
+
+
+def precompute(cache, key, compute):
+    """
+    Fill a cache entry in a background thread unless it is already cached.
+    A foreground request for the same key waits for this computation instead
+    of starting another one
+    """
+    pending_key = (id(cache), key)
+    with _caches_lock:
+        if key in cache or pending_key in _pending:
+            return
+        _pending.add(pending_key)
+
+    def run():
+        try:
+            cache.get_or_compute(key, compute)
+        finally:
+            with _caches_lock:
+                _pending.discard(pending_key)
+
+    _precompute_pool.submit(run)
@@ -0,0 +1,28 @@
+# Define Industries and stocks
+industries = {
+    'Banks': ['ANZ.AX', 'CBA.AX', 'NAB.AX', 'WBC.AX', 'BOQ.AX', 'BEN.AX'],
+    'Financial Services': ['MQG.AX', 'SQ2.AX', 'ASX.AX', 'SOL.AX', 'CCP.AX', 'EQT.AX'],
+    'Insurance': ['QBE.AX', 'SUN.AX', 'IAG.AX', 'MPL.AX', 'SDF.AX', 'AUB.AX'],
+    'Software & Services': ['WTC.AX', 'XRO.AX', 'NXT.AX', 'TNE.AX', '360.AX', 'MAQ.AX'],
+    'Media & Entertainment': ['REA.AX', 'NWS.AX', 'CAR.AX', 'SEK.AX', 'NEC.AX']
+}
+
+
+def all_tickers():
+    """Every ticker in the industries universe, in menu order"""
+    return [ticker for tickers in industries.values() for ticker in tickers]
+
+
+# Benchmark indices offered on the correlation page. Indices are fetched
+# concurrently, so adding more does not add a round trip per index
+BENCHMARK_INDICES = {
+    'ASX200': '^AXJO',
+    'ALL-ORD': '^AORD',
+    'ASX300': '^AXKO',
+    'ASX50': '^AFLI',
+    'ASX20': '^ATLI',
+    'ASX200 Financials': '^AXFJ',
+    'ASX200 Info Tech': '^AXIJ',
+}
+
+DEFAULT_BENCHMARKS = ['ASX200', 'ALL-ORD', 'ASX300']
@@ -1,10 +1,14 @@
 import streamlit as st
+import copy
 import json
 import os
-from io import StringIO
 import re
 import urllib
 
+from article_store import ArticleFormatError, get_article_store
+
+# Articles shown per page of a large upload
+ARTICLES_PER_PAGE = 5
 
 # Mapping of fields to claims and whether they are broad claims or sub-claims
 claim_mapping = {
@@ -111,42 +115,13 @@ def is_valid_category(category):
     return category not in ['Broad Claims:', 'Sub-Claims:', 'Remove sentence']
 
 
-def load_json_file(file):
-    """
-    Load and validate JSON file contents
-    Returns processed data if valid, None if invalid
-    """
-    try:
-        if isinstance(file, str):
-            # Reading from direct file path
-            with open(file, 'r', encoding='utf-8') as f:
-                json_data = json.load(f)
-        else:
-            # Reading from uploaded file through Streamlit
-            json_file = StringIO(file.getvalue().decode("utf-8"))
-            json_data = json.load(json_file)
-
-        # Validate JSON structure
-        if not isinstance(json_data, list):
-            st.error("Invalid JSON format. Expected a list of articles.")
-            return None
-
-        # Validate required fields
-        required_fields = ['uri', 'title', 'body', 'source']
-        for article in json_data:
-            missing_fields = [field for field in required_fields if field not in article]
-            if missing_fields:
-                st.error(f"Article {article.get('uri', 'Unknown')} is missing required fields: {missing_fields}")
-                return None
-
-        return json_data
+@st.fragment(run_every=1)
+def show_loading_progress(store):
+    """Report parsing progress of a streamed upload; rerun the page once it is complete"""
+    if store.done:
+        st.rerun()
+    st.caption(f"Loading articles… {len(store)} read so far from {store.size / 1e6:.1f} MB")
 
-    except json.JSONDecodeError as e:
-        st.error(f"Invalid JSON file: {str(e)}")
-        return None
-    except Exception as e:
-        st.error(f"Error processing file: {str(e)}")
-        return None
 
 def get_field_value(field):
     """Extract value from either string or dict with 'S' key"""
@@ -281,18 +256,26 @@ uploaded_file = st.file_uploader("", type="json")
 
 if uploaded_file:
     try:
-        # Load and process the JSON file
-        json_file = StringIO(uploaded_file.getvalue().decode("utf-8"))
-        json_data = json.load(json_file)
+        # Load and process the JSON file: parsed once per upload, large files
+        # stream in while the first pages are shown
+        store = get_article_store(uploaded_file)
         st.session_state.original_filename = uploaded_file.name
 
-        if isinstance(json_data, list):
-            articles = json_data
+        # Only the articles up to the current page (and one past it) are needed
+        store.wait((st.session_state.current_page + 1) * ARTICLES_PER_PAGE + 1)
+        if store.error:
+            raise store.error
+
+        if not store.done:
+            show_loading_progress(store)
+
+        if store.done or len(store):
+            articles = store.articles
             total_articles = len(articles)
 
             # Determine pagination strategy
-            USE_PAGINATION = total_articles > 5
-            articles_per_page = 5 if USE_PAGINATION else total_articles
+            USE_PAGINATION = total_articles > ARTICLES_PER_PAGE
+            articles_per_page = ARTICLES_PER_PAGE if USE_PAGINATION else total_articles
 
             if USE_PAGINATION:
                 total_pages = (total_articles + articles_per_page - 1) // articles_per_page
@@ -331,6 +314,7 @@ if uploaded_file:
             # Process articles
             for index, article in enumerate(current_articles, start=1 if not USE_PAGINATION else start_idx + 1):
                 article_id = str(index)
+                position = index - 1
 
                 # Initialize session state for current article
                 if article_id not in st.session_state.all_changes:
@@ -388,61 +372,8 @@ if uploaded_file:
                                 else:
                                     target_sentence = str(target_sentence)
 
-                                # Get article body in a consistent format
-                                article_body = article.get('body')
-                                if isinstance(article_body, dict) and 'S' in article_body:
-                                    article_body = article_body['S']
-                                else:
-                                    article_body = str(article_body or '')
-
-                                # Split into sentences more precisely
-                                # First, temporarily replace [link] to avoid interference with sentence splitting
-                                article_body = article_body.replace('[link]', '<<LINK_MARKER>>')
-
-                                # Split sentences using regex that handles various end punctuation
-                                sentences = re.split(r'(?<=[.!?])\s+(?=[A-Z])', article_body)
-                                sentences = [s.strip() for s in sentences if s.strip()]
-
-                                # Restore [link] markers
-                                sentences = [s.replace('<<LINK_MARKER>>', '[link]') for s in sentences]
-
-                                # Find the exact target sentence and its position
-                                target_index = -1
-                                for i, sentence in enumerate(sentences):
-                                    if target_sentence.strip() in sentence:
-                                        target_index = i
-                                        break
-
-                                # Get context with exactly one sentence before and after
-                                context_sentences = []
-                                if target_index >= 0:
-                                    # Add one previous sentence if available
-                                    if target_index > 0:
-                                        prev_sentence = sentences[target_index - 1].strip()
-                                        if prev_sentence:
-                                            context_sentences.append(prev_sentence)
-
-                                    # Add target sentence
-                                    context_sentences.append(sentences[target_index].strip())
-
-                                    # Add one next sentence if available, excluding anything after [link]
-                                    if target_index < len(sentences) - 1:
-                                        next_sentence = sentences[target_index + 1].strip()
-                                        if next_sentence:
-                                            # If sentence contains [link], split before it
-                                            if '[link]' in next_sentence:
-                                                next_sentence = next_sentence.split('[link]')[0].strip()
-                                            context_sentences.append(next_sentence)
-
-                                    # Join sentences and highlight target
-                                    sentence_with_context = " ".join(context_sentences)
-                                    sentence_with_context = sentence_with_context.replace(
-                                        target_sentence,
-                                        f"<b style='background-color: #e80000;'>{target_sentence}</b>"
-                                    )
-                                else:
-                                    # Fallback if target sentence not found
-                                    sentence_with_context = f"<b style='background-color: #e80000;'>{target_sentence}</b>"
+                                # Sentence with one either side, highlighted once at load time
+                                sentence_with_context = store.sentence_index(position).context(field)
 
                                 # Display with consistent format
                                 sentence_html = f'''
@@ -602,7 +533,8 @@ if uploaded_file:
                             unsafe_allow_html=True)
                     elif all_valid:
                         updated_articles = []
-                        for article in articles:
+                        # Every article, once the upload has been parsed to the end
+                        for position, article in enumerate(store.all(), start=1):
                             # Create initial copy with {"S": value} format
                             updated_article = {}
 
@@ -610,8 +542,9 @@ if uploaded_file:
                             for k, v in article.items():
                                 if k != 'articleId':  # Skip articleId field
                                     if isinstance(v, dict) and 'S' in v:
-                                        # Already in correct format
-                                        updated_article[k] = v.copy()
+                                        # Already in correct format; deep-copied, the parsed
+                                        # article is shared by every rerun and session
+                                        updated_article[k] = copy.deepcopy(v)
                                     elif isinstance(v, str):
                                         # Convert string to {"S": value} format
                                         updated_article[k] = {"S": v}
@@ -624,7 +557,7 @@ if uploaded_file:
                                 uri_value = updated_article.pop('uri')
                                 updated_article = {'uri': uri_value, **updated_article}
 
-                            article_id = str(articles.index(article) + 1)
+                            article_id = str(position)
 
                             # Process changes
                             if article_id in st.session_state.all_changes:
@@ -649,7 +582,7 @@ if uploaded_file:
                                             if field in article:
                                                 value = article[field]
                                                 if isinstance(value, dict) and 'S' in value:
-                                                    updated_article[field] = value.copy()
+                                                    updated_article[field] = copy.deepcopy(value)
                                                 else:
                                                     updated_article[field] = {"S": str(value)}
 
@@ -670,6 +603,8 @@ if uploaded_file:
                                             new_value = value["S"]
 
                                             if isinstance(current_value, list):
+                                                # Extend a copy, never the list of a stored article
+                                                current_value = list(current_value)
                                                 if isinstance(new_value, list):
                                                     current_value.extend(s for s in new_value if s not in current_value)
                                                 elif new_value not in current_value:
@@ -708,5 +643,7 @@ if uploaded_file:
 
     except json.JSONDecodeError as e:
         st.error(f"Error decoding JSON file: {str(e)}")
+    except ArticleFormatError as e:
+        st.error(str(e))
     except Exception as e:
         st.error(f"An error occurred: {str(e)}")